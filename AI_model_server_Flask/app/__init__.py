@@ -1,3 +1,5 @@
+import threading
+import time
 from flask import Flask
 from flask_cors import CORS
 from flask_socketio import SocketIO
@@ -6,9 +8,14 @@ from app.config import Config
 # Initialize SocketIO
 socketio = SocketIO(cors_allowed_origins="*")
 
+# Readiness gate reported by /ready (set once warm-up has finished)
+readiness = threading.Event()
+warmup_status = {'state': 'pending', 'duration_ms': None, 'error': None}
+
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    readiness.clear()
     
     # Configure CORS
     CORS(app, resources={r"/*": {"origins": "*"}})  # In production, restrict to frontend domain
@@ -23,8 +30,22 @@ def create_app(config_class=Config):
     # Now create tables (models are registered with SQLAlchemy)
     create_tables(app)
     
-    # Initialize SocketIO with the app
+    # Auth decorators: token verifier (keys loaded now, not on the first request)
+    # plus the verified-token and user-identity caches
+    from app.auth_middleware import init_auth
+    init_auth(app)
+    
+    # Initialize SocketIO with the app (connect handler authenticates and joins rooms)
     socketio.init_app(app)
+    from app import sockets
+    
+    # Configure model serving (optional request coalescing), feature scaling and CSV data loading
+    from app.services import fraud_service
+    from app.data_service import data_service
+    from app.features import feature_pipeline
+    fraud_service.init_app(app)
+    feature_pipeline.init_app(app)
+    data_service.init_app(app)
     
     # Register blueprints
     from app.routes import main
@@ -34,13 +55,82 @@ def create_app(config_class=Config):
     from app.api_routes import api
     app.register_blueprint(api, url_prefix='/api')
     
-    # Seed demo data on first run
+    # Seed demo data on first run, then bring the admin stats counters in line
+    from app.models import SystemCounters
     with app.app_context():
         seed_demo_data(db)
+        SystemCounters.reconcile()
+    
+    if app.config.get('STATS_RECONCILE_INTERVAL', 0) > 0:
+        socketio.start_background_task(reconcile_counters, app, app.config['STATS_RECONCILE_INTERVAL'])
+    
+    # Post-commit side effects of payments (alerts, risk profiles, notifications)
+    from app.outbox import outbox
+    outbox.init_app(app)
+    
+    # Preload model and data so no user request lands on a cold worker
+    if app.config.get('PRELOAD_ON_STARTUP'):
+        warmup_status.update(state='warming', duration_ms=None, error=None)
+        socketio.start_background_task(warm_up, app)
+    else:
+        warmup_status.update(state='lazy', duration_ms=None, error=None)
+        readiness.set()
     
     return app
 
 
+def warm_up(app):
+    """
+    Load the model and CSV data, then run synthetic predictions and lookups
+    to fault in pages and caches. Marks the app ready when done; a failed
+    warm-up leaves it unready so the load balancer keeps traffic away.
+    """
+    import numpy as np
+    from app.services import fraud_service
+    from app.data_service import data_service
+    
+    started = time.perf_counter()
+    try:
+        with app.app_context():
+            fraud_service.load_model()
+            data_service.load_data()
+            
+            rows = np.random.default_rng(0).random((app.config['WARMUP_PREDICTIONS'], 22))
+            fraud_service.predict_batch(rows)
+            for row in rows:
+                fraud_service.predict(row)
+            
+            data_service.get_user_by_upi('demo.user@upi')
+            data_service.get_transaction_frequency('demo.user@upi', hours=24)
+            data_service.get_time_since_last_transaction('demo.user@upi')
+            data_service.search_users('demo')
+        
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        warmup_status.update(state='ready', duration_ms=duration_ms)
+        readiness.set()
+        print(f"🔥 Warm-up complete in {duration_ms} ms")
+    except Exception as e:
+        warmup_status.update(state='failed', error=str(e))
+        print(f"❌ Warm-up failed: {e}")
+
+
+def reconcile_counters(app, interval):
+    """Periodically recount the admin stats counters to correct any drift."""
+    from app.models import SystemCounters
+    
+    while True:
+        socketio.sleep(interval)
+        try:
+            with app.app_context():
+                before = SystemCounters.get().to_dict()
+                after = SystemCounters.reconcile().to_dict()
+                drift = {name: after[name] - before[name] for name in SystemCounters.COUNTER_NAMES if after[name] != before[name]}
+                if drift:
+                    print(f"🔁 Stats counters reconciled, drift corrected: {drift}")
+        except Exception as e:
+            print(f"❌ Stats counter reconciliation failed: {e}")
+
+
 def seed_demo_data(db):
     """Seed initial demo data if database is empty."""
     from app.models import User, UserRiskProfile, VerificationStatus
@@ -6,14 +6,18 @@ Handles authentication, transactions, user management, and admin operations.
 from flask import Blueprint, request, jsonify, g
 from datetime import datetime, timedelta
 from decimal import Decimal
+from sqlalchemy.orm import joinedload
 
 from app.database import db
-from app.models import User, Transaction, FraudAlert, UserRiskProfile
+from app.models import User, Transaction, FraudAlert, UserRiskProfile, UserVelocity, SystemCounters
 from app.models import VerificationStatus, TransactionStatus, AlertSeverity
-from app.auth_middleware import auth_required, admin_required, optional_auth, get_current_user
+from app.auth_middleware import auth_required, admin_required, optional_auth, get_current_user, invalidate_user
 from app.services import fraud_service
 from app.data_service import data_service
-from app.utils import success_response, error_response
+from app.features import feature_pipeline
+from app.outbox import outbox
+from app.sockets import emit_stats_delta
+from app.utils import success_response, error_response, encode_cursor, decode_cursor
 
 api = Blueprint('api', __name__)
 
@@ -74,8 +78,18 @@ def register():
             trust_score=50.0,
         )
         db.session.add(risk_profile)
+        SystemCounters.increment(total_users=1)
         
         db.session.commit()
+        emit_stats_delta({'total_users': 1})
+        
+        # Make the new user discoverable in recipient autocomplete
+        data_service.index_search_user({
+            'upi_id': user.upi_id,
+            'display_name': user.display_name,
+            'verification_status': user.verification_status.value,
+            'risk_category': risk_profile.get_risk_category(),
+        })
         
         return success_response({
             'user': user.to_dict(include_private=True),
@@ -169,6 +183,7 @@ def update_profile():
         user.phone_number = data['phone_number']
     
     db.session.commit()
+    invalidate_user(user)
     
     return success_response(user.to_dict(include_private=True), "Profile updated")
 
@@ -235,6 +250,7 @@ def send_transaction():
         
         # Get receiver
         receiver = User.query.filter_by(upi_id=receiver_upi).first()
+        user_deltas = {}  # Counter increments from JIT provisioning, pushed after commit
         
         # If receiver not in DB, try to provision from CSV
         if not receiver:
@@ -271,7 +287,15 @@ def send_transaction():
                     geo_location_flag=csv_user.get('geo_location_flag', 'normal')
                 )
                 db.session.add(risk_profile)
-                db.session.commit()
+                user_deltas = {
+                    'total_users': 1,
+                    'suspended_users': 1 if status_enum == VerificationStatus.SUSPENDED else 0,
+                }
+                SystemCounters.increment(**user_deltas)
+                db.session.flush()  # Committed together with the transaction below
+                
+                # Keep the search index in step with the provisioned profile
+                data_service.index_search_user(csv_user)
             else:
                 return error_response(f"Receiver '{receiver_upi}' not found", 404)
         
@@ -292,6 +316,9 @@ def send_transaction():
         db.session.add(transaction)
         db.session.flush()
         
+        # Update sender/receiver velocity counters (committed with the transaction)
+        UserVelocity.record_transaction(transaction)
+        
         # Perform fraud detection
         fraud_result = perform_fraud_check(sender, receiver, float(amount))
         
@@ -303,52 +330,39 @@ def send_transaction():
             # Block the transaction
             transaction.status = TransactionStatus.BLOCKED
             transaction.failure_reason = "Fraud detected"
-            
-            # Create fraud alert
-            alert = FraudAlert(
-                transaction_id=transaction.id,
-                alert_type='fraud_detected',
-                severity=AlertSeverity.HIGH if fraud_result['fraud_probability'] > 0.7 else AlertSeverity.MEDIUM,
-                description=f"Transaction blocked: {', '.join(fraud_result.get('risk_factors', [])[:3])}",
-            )
-            db.session.add(alert)
-            
-            # Increment receiver's fraud flags
-            if receiver.risk_profile:
-                receiver.risk_profile.fraud_flags += 1
-                receiver.risk_profile.fraud_complaints_received += 1
+            SystemCounters.increment(total_transactions=1, blocked_transactions=1)
             
         else:
             # Complete the transaction
             transaction.status = TransactionStatus.COMPLETED
             transaction.processed_at = datetime.utcnow()
+            SystemCounters.increment(total_transactions=1)
             
             # Update balances
             # sender.account_balance -= amount # Don't deduct from sender in demo mode
             sender.daily_spent += amount
             receiver.account_balance += amount
-            
-            # Update risk profiles
-            if sender.risk_profile:
-                sender.risk_profile.total_transactions += 1
-                sender.risk_profile.successful_transactions += 1
-                sender.risk_profile.last_transaction_at = datetime.utcnow()
-            
-            if receiver.risk_profile:
-                receiver.risk_profile.total_transactions += 1
-                receiver.risk_profile.successful_transactions += 1
-        
-        db.session.commit()
         
-        # Emit WebSocket event
-        from app import socketio
-        socketio.emit('transaction_update', {
+        # Fraud alert, risk-profile aggregates and the WebSocket notifications run
+        # after the response (app/outbox.py); they commit atomically with the decision
+        event = {
+            'transaction_id': transaction.id,
             'transaction_ref': transaction.transaction_ref,
+            'sender_id': sender.id,
+            'receiver_id': receiver.id,
             'status': transaction.status.value,
             'is_fraud': transaction.is_fraud,
-        })
+            'fraud_probability': transaction.fraud_score,
+            'risk_factors': transaction.risk_factors or [],
+            'processed_at': transaction.processed_at.isoformat() if transaction.processed_at else None,
+        }
+        events = [
+            outbox.enqueue('transaction.blocked' if transaction.is_fraud else 'transaction.completed', event),
+            outbox.enqueue('transaction.notify', event),
+            outbox.enqueue('transaction.dashboard', event),
+        ]
         
-        return success_response({
+        response = {
             'transaction_ref': transaction.transaction_ref,
             'status': transaction.status.value,
             'is_fraud': transaction.is_fraud,
@@ -357,53 +371,89 @@ def send_transaction():
             'risk_factors': transaction.risk_factors or [],
             'message': 'Transaction blocked - Potential fraud detected' if transaction.is_fraud else 'Transaction successful',
             'new_balance': float(sender.account_balance),
-        }, "Transaction blocked" if transaction.is_fraud else "Transaction completed")
+        }
         
+        db.session.flush()
+        event_ids = [queued.id for queued in events]
+        db.session.commit()
+    
     except Exception as e:
         db.session.rollback()
         import traceback
         traceback.print_exc()
         return error_response(str(e), 500)
+    
+    # Committed: side effects can no longer fail the payment
+    emit_stats_delta(user_deltas)
+    outbox.notify(event_ids)
+    
+    return success_response(response, "Transaction blocked" if response['is_fraud'] else "Transaction completed")
 
 
 @api.route('/transactions/history', methods=['GET'])
 @auth_required
 def get_transaction_history():
-    """Get paginated transaction history for current user."""
+    """
+    Get transaction history for current user, newest first.
+    
+    Keyset pagination: pass the returned `next_cursor` as `cursor` to fetch the
+    next page (every page costs the same). `include_total=true` adds the total
+    count. Requests with `page` use the legacy offset pagination with totals.
+    """
     user = get_current_user()
     
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = max(request.args.get('per_page', 20, type=int), 1)
     status_filter = request.args.get('status')
+    cursor = request.args.get('cursor')
+    legacy_page = request.args.get('page', type=int) if cursor is None else None
+    include_total = legacy_page is not None or request.args.get('include_total', 'false').lower() == 'true'
     
-    query = Transaction.query.filter(
-        (Transaction.sender_id == user.id) | (Transaction.receiver_id == user.id)
-    )
-    
+    criteria = []
     if status_filter:
         try:
             status = TransactionStatus(status_filter)
-            query = query.filter_by(status=status)
+            criteria.append(Transaction.status == status)
         except ValueError:
             pass
     
-    query = query.order_by(Transaction.created_at.desc())
-    
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    page_criteria = list(criteria)
+    if cursor:
+        try:
+            page_criteria.append(Transaction.before(*decode_cursor(cursor)))
+        except ValueError as e:
+            return error_response(str(e))
+    
+    # Sent and received rows come from separate (party, created_at) index scans;
+    # one extra row tells us whether another page exists. Sender/receiver are
+    # loaded in the same query (to_dict reads both UPI IDs).
+    offset = (max(legacy_page, 1) - 1) * per_page if legacy_page is not None else 0
+    items = (
+        Transaction.for_user(user.id, *page_criteria, limit=per_page + 1, offset=offset)
+        .options(joinedload(Transaction.sender), joinedload(Transaction.receiver))
+        .all()
+    )
+    has_more = len(items) > per_page
+    items = items[:per_page]
     
-    transactions = [t.to_dict() for t in pagination.items]
+    transactions = [t.to_dict() for t in items]
     
     # Mark direction (sent/received)
     for t in transactions:
         t['direction'] = 'sent' if t['sender_upi_id'] == user.upi_id else 'received'
     
-    return success_response({
+    data = {
         'transactions': transactions,
-        'total': pagination.total,
-        'page': page,
         'per_page': per_page,
-        'pages': pagination.pages,
-    }, f"Found {len(transactions)} transactions")
+        'has_more': has_more,
+        'next_cursor': encode_cursor(items[-1].created_at, items[-1].id) if has_more else None,
+    }
+    if include_total:
+        data['total'] = Transaction.count_for_user(user.id, *criteria)
+    if legacy_page is not None:
+        data['page'] = max(legacy_page, 1)
+        data['pages'] = (data['total'] + per_page - 1) // per_page
+    
+    return success_response(data, f"Found {len(transactions)} transactions")
 
 
 @api.route('/transactions/<ref>', methods=['GET'])
@@ -432,26 +482,54 @@ def get_transaction_detail(ref):
 @auth_required
 @admin_required
 def get_fraud_alerts():
-    """Get pending fraud alerts for review."""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    """
+    Get pending fraud alerts for review, newest first.
+    Paginated like /transactions/history (cursor, include_total, legacy page).
+    """
+    per_page = max(request.args.get('per_page', 20, type=int), 1)
     reviewed_filter = request.args.get('reviewed', 'false').lower() == 'true'
+    cursor = request.args.get('cursor')
+    legacy_page = request.args.get('page', type=int) if cursor is None else None
+    include_total = legacy_page is not None or request.args.get('include_total', 'false').lower() == 'true'
     
     query = FraudAlert.query
     
     if not reviewed_filter:
         query = query.filter_by(reviewed=False)
     
-    query = query.order_by(FraudAlert.created_at.desc())
-    
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    page_query = query
+    if cursor:
+        try:
+            page_query = page_query.filter(FraudAlert.before(*decode_cursor(cursor)))
+        except ValueError as e:
+            return error_response(str(e))
+    
+    page_query = page_query.order_by(FraudAlert.created_at.desc(), FraudAlert.id.desc())
+    if legacy_page is not None:
+        page_query = page_query.offset((max(legacy_page, 1) - 1) * per_page)
+    
+    # to_dict reads the transaction ref and reviewer name; load both with the page
+    alerts = (
+        page_query
+        .options(joinedload(FraudAlert.transaction), joinedload(FraudAlert.reviewer))
+        .limit(per_page + 1)
+        .all()
+    )
+    has_more = len(alerts) > per_page
+    alerts = alerts[:per_page]
     
-    return success_response({
-        'alerts': [a.to_dict() for a in pagination.items],
-        'total': pagination.total,
-        'page': page,
+    data = {
+        'alerts': [a.to_dict() for a in alerts],
         'per_page': per_page,
-    }, f"Found {pagination.total} alerts")
+        'has_more': has_more,
+        'next_cursor': encode_cursor(alerts[-1].created_at, alerts[-1].id) if has_more else None,
+    }
+    if include_total:
+        data['total'] = query.order_by(None).count()
+    if legacy_page is not None:
+        data['page'] = max(legacy_page, 1)
+    
+    return success_response(data, f"Found {len(alerts)} alerts")
 
 
 @api.route('/admin/alerts/<int:alert_id>/review', methods=['PUT'])
@@ -466,6 +544,10 @@ def review_alert(alert_id):
     if not alert:
         return error_response("Alert not found", 404)
     
+    was_pending = not alert.reviewed
+    if was_pending:
+        SystemCounters.increment(pending_alerts=-1)
+    
     alert.reviewed = True
     alert.reviewed_by = admin.id
     alert.reviewed_at = datetime.utcnow()
@@ -473,6 +555,7 @@ def review_alert(alert_id):
     alert.action_taken = data.get('action', 'reviewed')
     
     db.session.commit()
+    emit_stats_delta({'pending_alerts': -1 if was_pending else 0})
     
     return success_response(alert.to_dict(), "Alert reviewed")
 
@@ -486,6 +569,10 @@ def suspend_user(user_id):
     if not user:
         return error_response("User not found", 404)
     
+    newly_suspended = user.verification_status != VerificationStatus.SUSPENDED
+    if newly_suspended:
+        SystemCounters.increment(suspended_users=1)
+    
     user.is_active = False
     user.verification_status = VerificationStatus.SUSPENDED
     
@@ -493,6 +580,8 @@ def suspend_user(user_id):
         user.risk_profile.blacklist_status = True
     
     db.session.commit()
+    invalidate_user(user)
+    emit_stats_delta({'suspended_users': 1 if newly_suspended else 0})
     
     return success_response({'user_id': user_id}, "User suspended")
 
@@ -501,19 +590,16 @@ def suspend_user(user_id):
 @auth_required
 @admin_required
 def get_admin_stats():
-    """Get system-wide statistics."""
-    total_users = User.query.count()
-    total_transactions = Transaction.query.count()
-    blocked_transactions = Transaction.query.filter_by(status=TransactionStatus.BLOCKED).count()
-    pending_alerts = FraudAlert.query.filter_by(reviewed=False).count()
+    """
+    Get system-wide statistics.
+    Served from the maintained SystemCounters shards (one aggregate read).
+    """
+    counters = SystemCounters.get() or SystemCounters.reconcile()
     
-    return success_response({
-        'total_users': total_users,
-        'total_transactions': total_transactions,
-        'blocked_transactions': blocked_transactions,
-        'fraud_rate': round(blocked_transactions / max(total_transactions, 1) * 100, 2),
-        'pending_alerts': pending_alerts,
-    }, "Stats retrieved")
+    stats = counters.to_dict()
+    stats['fraud_rate'] = round(counters.blocked_transactions / max(counters.total_transactions, 1) * 100, 2)
+    
+    return success_response(stats, "Stats retrieved")
 
 
 # ============================================================================
@@ -532,47 +618,25 @@ def perform_fraud_check(sender, receiver, amount):
     # Build features for the model
     hour = datetime.now().hour
     
-    # Normalization ranges (from training data)
-    NORM_RANGES = {
-        'transaction_amount': (0.005817, 4747.858107),
-        'transaction_frequency': (0, 13),
-        'behavioral_biometrics': (0.00004, 3.0),
-        'time_since_last': (0.000168, 29.997497),
-        'social_trust_score': (0.012724, 99.987487),
-        'account_age': (0.000975, 4.999239),
-        'normalized_amount': (0.000421, 1.256827),
-        'context_anomalies': (0.000095, 3.997015),
-        'fraud_complaints': (0, 5),
-    }
-    
-    def normalize(value, min_val, max_val):
-        if max_val == min_val:
-            return 0.0
-        return max(0, min(1, (value - min_val) / (max_val - min_val)))
-    
     # --- DYNAMIC FEATURE EXTRACTION ---
     
+    # DB velocity for the receiver: one primary-key read of the maintained counters,
+    # rebuilt from transaction history if the row does not exist yet
+    now = datetime.utcnow()
+    velocity = db.session.get(UserVelocity, receiver.id) or UserVelocity.from_history(receiver.id, now)
+    
     # 1. Frequency (Last 24h)
     # Combine CSV history + DB recent transactions
     csv_freq = data_service.get_transaction_frequency(receiver.upi_id, hours=24)
-    # Count DB transactions in last 24h
-    cutoff = datetime.utcnow() - timedelta(hours=24)
-    db_freq = Transaction.query.filter(
-        (Transaction.sender_id == receiver.id) | (Transaction.receiver_id == receiver.id),
-        Transaction.created_at >= cutoff
-    ).count()
+    db_freq = velocity.count_since(now, hours=24)
     transaction_frequency = csv_freq + db_freq
     
     # 2. Time Since Last Transaction
     # Min of CSV time and DB time
     csv_time_since = data_service.get_time_since_last_transaction(receiver.upi_id)
     
-    last_db_tx = Transaction.query.filter(
-        (Transaction.sender_id == receiver.id) | (Transaction.receiver_id == receiver.id)
-    ).order_by(Transaction.created_at.desc()).first()
-    
-    if last_db_tx:
-        db_time_since = (datetime.utcnow() - last_db_tx.created_at).total_seconds() / 3600.0
+    if velocity.last_tx_at:
+        db_time_since = (now - velocity.last_tx_at).total_seconds() / 3600.0
         time_since_last = min(csv_time_since, db_time_since)
     else:
         time_since_last = csv_time_since
@@ -600,53 +664,40 @@ def perform_fraud_check(sender, receiver, amount):
     location_inconsistent = 1 if geo_flag == 'unusual' else 0
     context_anomalies = random.uniform(0, 1.0) # Low anomaly
     
-    # Normalize features
-    norm_amount = normalize(amount, *NORM_RANGES['transaction_amount'])
-    norm_frequency = normalize(transaction_frequency, *NORM_RANGES['transaction_frequency'])
-    norm_blacklist = 1 if (risk_profile and risk_profile.blacklist_status) else 0
-    norm_device = device_fingerprint
-    norm_vpn = vpn_usage
-    norm_biometrics = normalize(behavioral_biometrics, *NORM_RANGES['behavioral_biometrics'])
-    norm_time = normalize(time_since_last, *NORM_RANGES['time_since_last'])
-    norm_trust = normalize(trust_score, *NORM_RANGES['social_trust_score'])
-    
     # Account age
     if receiver.created_at:
         account_age_days = (datetime.utcnow() - receiver.created_at).days
         account_age_years = account_age_days / 365.0
     else:
         account_age_years = 1.0
-    norm_age = normalize(account_age_years, *NORM_RANGES['account_age'])
     
+    norm_blacklist = 1 if (risk_profile and risk_profile.blacklist_status) else 0
     norm_high_risk_time = 1 if (hour >= 23 or hour <= 5) else 0
     norm_past_fraud = 1 if past_fraud_flags > 0 else 0
-    norm_location = location_inconsistent
     
-    raw_norm_amount = min(amount / 5000, 1.26)
-    norm_norm_amount = normalize(raw_norm_amount, *NORM_RANGES['normalized_amount'])
-    
-    norm_context = normalize(context_anomalies, *NORM_RANGES['context_anomalies'])
-    norm_complaints = normalize(fraud_complaints, *NORM_RANGES['fraud_complaints'])
-    norm_mismatch = 0 # Merchant mismatch (not applicable for P2P yet)
-    norm_limit = 1 if amount > 100000 else 0
-    norm_high_value = 1 if amount > 50000 else 0
-    
-    # One-hot encoded categorical features
     verification = receiver.verification_status.value if receiver.verification_status else 'pending'
     is_suspicious = 1 if verification == 'suspended' or verification == 'suspicious' else 0
-    is_verified = 1 if verification == 'verified' else 0
-    
-    is_geo_normal = 1 if geo_flag == 'normal' else 0
-    is_geo_unusual = 1 if geo_flag == 'unusual' else 0
-    
-    # Build feature array (22 features)
-    features = [
-        norm_amount, norm_frequency, norm_blacklist, norm_device, norm_vpn,
-        norm_biometrics, norm_time, norm_trust, norm_age, norm_high_risk_time,
-        norm_past_fraud, norm_location, norm_norm_amount, norm_context,
-        norm_complaints, norm_mismatch, norm_limit, norm_high_value,
-        is_suspicious, is_verified, is_geo_normal, is_geo_unusual,
-    ]
+    
+    # Build feature array (22 features); scaling and one-hot encoding live in the shared pipeline
+    features = feature_pipeline.build_row({
+        'amount': amount,
+        'hour': hour,
+        'frequency': transaction_frequency,
+        'time_since': time_since_last,
+        'blacklist': norm_blacklist,
+        'device': device_fingerprint,
+        'vpn': vpn_usage,
+        'biometrics': behavioral_biometrics,
+        'trust': trust_score,
+        'age': account_age_years,
+        'past_fraud': past_fraud_flags,
+        'location': location_inconsistent,
+        'context': context_anomalies,
+        'complaints': fraud_complaints,
+        'mismatch': 0, # Merchant mismatch (not applicable for P2P yet)
+        'verification_status': verification,
+        'geo_flag': geo_flag,
+    })
     
     # Get ML prediction
     result = fraud_service.predict(features)
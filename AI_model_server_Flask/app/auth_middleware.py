@@ -1,13 +1,26 @@
 """
 Authentication Middleware
 Handles Firebase token verification and user session management.
+
+Verified token claims are cached by token hash until the token expires, and
+firebase_uid -> user id lookups are cached until a profile-changing route
+calls invalidate_user(), so a repeat request skips signature verification
+and the firebase_uid query (the user row is loaded by primary key).
+With AUTH_TOKEN_VERIFIER=local, tokens are verified in-process by
+app/token_verifier.py instead of firebase_admin.
 """
 
+from collections import OrderedDict
 from functools import wraps
 from flask import request, g, jsonify
 import firebase_admin
 from firebase_admin import auth as firebase_auth, credentials
+import hashlib
 import os
+import threading
+import time
+
+from app.token_verifier import token_verifier
 
 # Initialize Firebase Admin SDK
 firebase_initialized = False
@@ -49,20 +62,115 @@ def init_firebase():
         return False
 
 
+class TTLCache:
+    """
+    Thread-safe LRU mapping whose entries also expire at a wall-clock time.
+    Holds at most `maxsize` entries; the least recently used is evicted first.
+    """
+    
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def configure(self, maxsize, ttl):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._entries.clear()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value, expires_at=None):
+        """Store `value` until `expires_at` (epoch seconds), capped at the cache TTL."""
+        if self.maxsize <= 0:
+            return
+        expires_at = min(expires_at or float('inf'), time.time() + self.ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+# Decoded Firebase claims by sha256(token), kept until the token's exp
+token_cache = TTLCache(maxsize=4096, ttl=3600)
+# firebase_uid -> user id of registered, active users (never ORM objects)
+identity_cache = TTLCache(maxsize=4096, ttl=300)
+
+DEMO_UID = 'demo-uid'
+
+
+def init_auth(app):
+    """
+    Size the token and identity caches from app config (size 0 disables a cache)
+    and prepare the token verifier at startup rather than on the first request.
+    """
+    token_cache.configure(app.config.get('AUTH_TOKEN_CACHE_SIZE', 4096), app.config.get('AUTH_TOKEN_CACHE_MAX_TTL', 3600))
+    identity_cache.configure(app.config.get('AUTH_USER_CACHE_SIZE', 4096), app.config.get('AUTH_USER_CACHE_TTL', 300))
+    
+    token_verifier.init_app(app)
+    if not token_verifier.enabled:
+        init_firebase()
+
+
+def invalidate_user(user):
+    """Drop a user's cached identity; call after changing their profile or status."""
+    if user is None:
+        return
+    if user.firebase_uid:
+        identity_cache.pop(user.firebase_uid)
+    if user.upi_id == 'demo.user@upi':
+        identity_cache.pop(DEMO_UID)
+
+
 def verify_firebase_token(id_token):
     """
     Verify a Firebase ID token and return the user info.
     Returns None if verification fails.
+    Successful results are served from token_cache until the token expires.
     """
-    if not init_firebase():
-        return None
+    cache_key = hashlib.sha256(id_token.encode()).hexdigest()
+    decoded_token = token_cache.get(cache_key)
+    if decoded_token is not None:
+        return decoded_token
     
     try:
-        decoded_token = firebase_auth.verify_id_token(id_token)
-        return decoded_token
+        if token_verifier.enabled:
+            # Local RS256 check against in-memory keys (app/token_verifier.py)
+            decoded_token = token_verifier.verify(id_token)
+        elif init_firebase():
+            decoded_token = firebase_auth.verify_id_token(id_token)
+        else:
+            return None
     except Exception as e:
         print(f"Token verification failed: {e}")
         return None
+    
+    token_cache.set(cache_key, decoded_token, expires_at=decoded_token.get('exp'))
+    return decoded_token
 
 
 def get_current_user():
@@ -70,6 +178,60 @@ def get_current_user():
     return getattr(g, 'current_user', None)
 
 
+def resolve_user_from_token(id_token):
+    """
+    Resolve a bearer token (Firebase ID token, or "demo-token" for the demo user)
+    to a registered user. Shared by the HTTP decorators and the Socket.IO
+    connect handler.
+    
+    Returns (user, firebase_uid, error) where error is None on success or a
+    (message, status_code) tuple.
+    """
+    # For demo mode: accept "demo-token" and use a demo user
+    if id_token == 'demo-token':
+        demo_user = _load_user(DEMO_UID, upi_id='demo.user@upi')
+        if not demo_user:
+            return None, None, ('Demo user not found', 401)
+        return demo_user, DEMO_UID, None
+    
+    # Verify Firebase token
+    decoded_token = verify_firebase_token(id_token)
+    
+    if not decoded_token:
+        return None, None, ('Invalid or expired token', 401)
+    
+    # Get user from Firebase UID
+    firebase_uid = decoded_token.get('uid')
+    user = _load_user(firebase_uid, firebase_uid=firebase_uid)
+    
+    if not user:
+        return None, firebase_uid, ('User not registered. Please complete registration first.', 403)
+    
+    if not user.is_active:
+        identity_cache.pop(firebase_uid)
+        return None, firebase_uid, ('Account is suspended', 403)
+    
+    return user, firebase_uid, None
+
+
+def _load_user(identity, **filters):
+    """Load the user for an identity: by cached id when known, else by `filters` (then cached)."""
+    from app.database import db
+    from app.models import User
+    
+    user_id = identity_cache.get(identity)
+    if user_id is not None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            return user
+        identity_cache.pop(identity)
+    
+    user = User.query.filter_by(**filters).first()
+    if user is not None and user.is_active:
+        identity_cache.set(identity, user.id)
+    return user
+
+
 def auth_required(f):
     """
     Decorator to require authentication for an endpoint.
@@ -77,8 +239,6 @@ def auth_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        from app.models import User
-        
         # Check for Authorization header
         auth_header = request.headers.get('Authorization')
         
@@ -96,45 +256,14 @@ def auth_required(f):
                 'message': 'Invalid authorization header format'
             }), 401
         
-        id_token = parts[1]
-        
-        # For demo mode: accept "demo-token" and use a demo user
-        if id_token == 'demo-token':
-            demo_user = User.query.filter_by(upi_id='demo.user@upi').first()
-            if demo_user:
-                g.current_user = demo_user
-                g.firebase_uid = 'demo-uid'
-                return f(*args, **kwargs)
-            else:
-                return jsonify({
-                    'status': 'error',
-                    'message': 'Demo user not found'
-                }), 401
-        
-        # Verify Firebase token
-        decoded_token = verify_firebase_token(id_token)
-        
-        if not decoded_token:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired token'
-            }), 401
-        
-        # Get or create user from Firebase UID
-        firebase_uid = decoded_token.get('uid')
-        user = User.query.filter_by(firebase_uid=firebase_uid).first()
+        user, firebase_uid, error = resolve_user_from_token(parts[1])
         
-        if not user:
+        if error:
+            message, status_code = error
             return jsonify({
                 'status': 'error',
-                'message': 'User not registered. Please complete registration first.'
-            }), 403
-        
-        if not user.is_active:
-            return jsonify({
-                'status': 'error',
-                'message': 'Account is suspended'
-            }), 403
+                'message': message
+            }), status_code
         
         # Set user in request context
         g.current_user = user
@@ -172,8 +301,6 @@ def optional_auth(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        from app.models import User
-        
         g.current_user = None
         g.firebase_uid = None
         
@@ -182,22 +309,10 @@ def optional_auth(f):
         if auth_header:
             parts = auth_header.split()
             if len(parts) == 2 and parts[0].lower() == 'bearer':
-                id_token = parts[1]
-                
-                # Demo mode
-                if id_token == 'demo-token':
-                    demo_user = User.query.filter_by(upi_id='demo.user@upi').first()
-                    if demo_user:
-                        g.current_user = demo_user
-                        g.firebase_uid = 'demo-uid'
-                else:
-                    decoded_token = verify_firebase_token(id_token)
-                    if decoded_token:
-                        firebase_uid = decoded_token.get('uid')
-                        user = User.query.filter_by(firebase_uid=firebase_uid).first()
-                        if user and user.is_active:
-                            g.current_user = user
-                            g.firebase_uid = firebase_uid
+                user, firebase_uid, error = resolve_user_from_token(parts[1])
+                if not error:
+                    g.current_user = user
+                    g.firebase_uid = firebase_uid
         
         return f(*args, **kwargs)
     
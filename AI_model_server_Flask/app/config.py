@@ -4,3 +4,60 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
     MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'best_rf_model (1).pkl')
     DEBUG = True
+    # 'sklearn' evaluates the pickled estimator; 'compiled' flattens it into app.forest.CompiledForest;
+    # 'mmap' opens the exported artifact at MODEL_ARTIFACT_PATH (see export_model.py) without unpickling
+    MODEL_ENGINE = os.environ.get('MODEL_ENGINE', 'sklearn')
+    MODEL_ARTIFACT_PATH = os.environ.get('MODEL_ARTIFACT_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'model_artifact')
+    # Upper bound on rows accepted by POST /predict/batch
+    MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))
+    # Micro-batching of concurrent single-row predictions
+    PREDICT_COALESCE_ENABLED = os.environ.get('PREDICT_COALESCE_ENABLED', 'false').lower() == 'true'
+    PREDICT_COALESCE_WINDOW_MS = float(os.environ.get('PREDICT_COALESCE_WINDOW_MS', 2.0))
+    PREDICT_COALESCE_MAX_BATCH = int(os.environ.get('PREDICT_COALESCE_MAX_BATCH', 64))
+    # Load model and CSV data at startup and gate /ready on warm-up
+    PRELOAD_ON_STARTUP = os.environ.get('PRELOAD_ON_STARTUP', 'false').lower() == 'true'
+    WARMUP_PREDICTIONS = int(os.environ.get('WARMUP_PREDICTIONS', 16))
+    # History CSV parsing: 'auto' (pyarrow if installed), 'pyarrow', 'c' or 'python';
+    # DATA_TRANSACTION_COLUMNS: comma-separated column names, or 'all' for every column
+    # (default: the columns the server uses; UPI IDs, amount and timestamp are always read)
+    DATA_CSV_ENGINE = os.environ.get('DATA_CSV_ENGINE', 'auto')
+    DATA_TRANSACTION_COLUMNS = os.environ.get('DATA_TRANSACTION_COLUMNS')
+    # Columnar (Arrow IPC) sidecar cache for the CSVs, rebuilt when a CSV changes
+    DATA_COLUMNAR_CACHE = os.environ.get('DATA_COLUMNAR_CACHE', 'true').lower() == 'true'
+    DATA_CACHE_DIR = os.environ.get('DATA_CACHE_DIR')
+    # Seconds between recounts of the /api/admin/stats counters from source tables (0 disables)
+    STATS_RECONCILE_INTERVAL = int(os.environ.get('STATS_RECONCILE_INTERVAL', 300))
+    # Database: any SQLAlchemy URL (default: SQLite file safepay.db next to the app)
+    DATABASE_URL = os.environ.get('DATABASE_URL')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    # SQLite connection pragmas (applied on connect; ignored for other databases)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024))  # negative = KiB
+    # Transactional outbox (app/outbox.py): post-commit side effects of payments.
+    # With the worker disabled, each request dispatches its own events inline after its
+    # commit; failed events stay pending until a worker or outbox.dispatch_pending() runs.
+    OUTBOX_WORKER_ENABLED = os.environ.get('OUTBOX_WORKER_ENABLED', 'true').lower() == 'true'
+    OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 1.0))
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 100))
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))
+    OUTBOX_LEASE_SECONDS = int(os.environ.get('OUTBOX_LEASE_SECONDS', 60))
+    # Auth caches (app/auth_middleware.py): verified token claims by token hash, kept
+    # until the token's exp (at most AUTH_TOKEN_CACHE_MAX_TTL s), and firebase_uid -> user id
+    AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 4096))
+    AUTH_TOKEN_CACHE_MAX_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_MAX_TTL', 3600))
+    AUTH_USER_CACHE_SIZE = int(os.environ.get('AUTH_USER_CACHE_SIZE', 4096))
+    AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 300))
+    # Token verification: 'firebase' (firebase_admin) or 'local' (in-process RS256 against
+    # keys from FIREBASE_PUBLIC_KEYS_PATH, or fetched at startup and refreshed in the background)
+    AUTH_TOKEN_VERIFIER = os.environ.get('AUTH_TOKEN_VERIFIER', 'firebase')
+    FIREBASE_PROJECT_ID = os.environ.get('FIREBASE_PROJECT_ID')
+    FIREBASE_PUBLIC_KEYS_PATH = os.environ.get('FIREBASE_PUBLIC_KEYS_PATH')
+    FIREBASE_PUBLIC_KEYS_URL = os.environ.get('FIREBASE_PUBLIC_KEYS_URL')
+    FIREBASE_KEYS_REFRESH_INTERVAL = int(os.environ.get('FIREBASE_KEYS_REFRESH_INTERVAL', 3600))
+    AUTH_TOKEN_LEEWAY_SECONDS = int(os.environ.get('AUTH_TOKEN_LEEWAY_SECONDS', 5))
@@ -5,15 +5,204 @@ Handles loading and querying synthetic data from CSV files.
 
 import pandas as pd
 import numpy as np
+import hashlib
+import json
 import os
 from flask import current_app
+from app.search_index import UserSearchIndex
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # Columnar cache is optional
+    pa = None
+    feather = None
+
+# Bump when the sidecar layout or parsing rules change, to invalidate old caches
+SIDECAR_VERSION = 1
+SIDECAR_METADATA_KEY = b'safepay_source'
+
+# Declared dtypes for upi_transactions.csv (timestamp is parsed as datetime64)
+TRANSACTION_SCHEMA = {
+    'transaction_id': str,
+    'sender_upi_id': 'category',
+    'receiver_upi_id': 'category',
+    'amount': 'float64',
+    'hour': 'int8',
+    'receiver_risk_category': 'category',
+    'raw_amount': 'float64',
+    'raw_frequency': 'int16',
+    'raw_verification': 'category',
+    'raw_blacklist': 'int8',
+    'raw_geo': 'category',
+    'raw_trust_score': 'float32',
+    'raw_account_age_years': 'float32',
+    'raw_fraud_complaints': 'int16',
+    'raw_past_fraud': 'int8',
+    **{f'norm_f{i}_{name}': 'float32' for i, name in enumerate([
+        'amount', 'frequency', 'blacklist', 'device', 'vpn', 'biometrics', 'time_since',
+        'trust', 'age', 'risk_time', 'past_fraud', 'location', 'norm_amount', 'context',
+        'complaints', 'mismatch', 'limit', 'high_value', 'suspicious', 'verified',
+        'geo_normal', 'geo_unusual',
+    ], start=1)},
+    'fraud_probability': 'float32',
+    'label': 'int8',
+}
+
+# Columns the server reads from the history table (history records, stats, velocity)
+TRANSACTION_COLUMNS = [
+    'transaction_id', 'sender_upi_id', 'receiver_upi_id', 'amount', 'timestamp',
+    'hour', 'receiver_risk_category', 'fraud_probability', 'label',
+]
+
+# Columns the lookups and velocity index can't work without; always read
+REQUIRED_TRANSACTION_COLUMNS = ['sender_upi_id', 'receiver_upi_id', 'amount', 'timestamp']
+
+
+def parse_column_list(setting):
+    """
+    DATA_TRANSACTION_COLUMNS as a list of column names: unset -> the server's
+    default columns, 'all' -> None (every column), else comma-separated names
+    plus any REQUIRED_TRANSACTION_COLUMNS they leave out.
+    """
+    if setting is None or not str(setting).strip():
+        return list(TRANSACTION_COLUMNS)
+    if isinstance(setting, str):
+        if setting.strip().lower() == 'all':
+            return None
+        columns = [c.strip() for c in setting.split(',') if c.strip()]
+    else:
+        columns = list(setting)
+    return columns + [c for c in REQUIRED_TRANSACTION_COLUMNS if c not in columns]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def resolve_csv_engine(engine):
+    """Map 'auto' to the pyarrow parser when it is installed, else pandas' C parser."""
+    if engine != 'auto':
+        return engine
+    try:
+        import pyarrow  # noqa: F401
+        return 'pyarrow'
+    except ImportError:
+        return 'c'
+
 
 class DataService:
     def __init__(self):
+        self.csv_engine = 'auto'
+        self.transaction_columns = TRANSACTION_COLUMNS
+        self.columnar_cache = True
+        self.cache_dir = None
         self.users_df = None
         self.transactions_df = None
+        self.users_by_upi = {}
+        self.search_index = UserSearchIndex()
+        self.tx_times_by_upi = {}
         self._loaded = False
     
+    def init_app(self, app):
+        """Configure CSV parsing from the app config."""
+        self.csv_engine = app.config.get('DATA_CSV_ENGINE', 'auto')
+        self.transaction_columns = parse_column_list(app.config.get('DATA_TRANSACTION_COLUMNS'))
+        self.columnar_cache = app.config.get('DATA_COLUMNAR_CACHE', True)
+        self.cache_dir = app.config.get('DATA_CACHE_DIR')
+    
+    def _sidecar_path(self, csv_path):
+        cache_dir = self.cache_dir or os.path.dirname(csv_path)
+        return os.path.join(cache_dir, os.path.basename(csv_path) + '.arrow')
+    
+    def _load_table(self, csv_path, reader, variant):
+        """
+        Load a CSV through its columnar sidecar (uncompressed Arrow IPC/Feather,
+        memory-mapped so workers share the pages). The sidecar is regenerated
+        from `reader` only when the CSV changed: mtime and size are compared
+        first, and the content hash decides when only the mtime moved.
+        `variant` identifies the parsing options the sidecar was built with.
+        """
+        if not self.columnar_cache or feather is None:
+            return reader(csv_path)
+        
+        sidecar_path = self._sidecar_path(csv_path)
+        stat = os.stat(csv_path)
+        source = {
+            'version': SIDECAR_VERSION,
+            'variant': variant,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+        }
+        
+        table = None
+        cached = None
+        if os.path.exists(sidecar_path):
+            try:
+                table = feather.read_table(sidecar_path, memory_map=True)
+                cached = json.loads((table.schema.metadata or {}).get(SIDECAR_METADATA_KEY, b'{}'))
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable cache {sidecar_path}: {e}")
+                table = None
+        
+        if table is not None and cached.get('version') == SIDECAR_VERSION and cached.get('variant') == variant:
+            if cached.get('mtime_ns') == source['mtime_ns'] and cached.get('size') == source['size']:
+                return table.to_pandas(split_blocks=True)
+            
+            source['sha256'] = file_sha256(csv_path)
+            if cached.get('sha256') == source['sha256']:
+                # Touched but unchanged: keep the data, refresh the fingerprint
+                df = table.to_pandas(split_blocks=True)
+                self._write_sidecar(sidecar_path, df, source)
+                return df
+        
+        df = reader(csv_path)
+        source.setdefault('sha256', file_sha256(csv_path))
+        self._write_sidecar(sidecar_path, df, source)
+        return df
+    
+    def _write_sidecar(self, sidecar_path, df, source):
+        """Atomically write `df` with its source fingerprint; failures only disable caching."""
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[SIDECAR_METADATA_KEY] = json.dumps(source).encode()
+            table = table.replace_schema_metadata(metadata)
+            
+            os.makedirs(os.path.dirname(sidecar_path), exist_ok=True)
+            tmp_path = f"{sidecar_path}.{os.getpid()}.tmp"
+            feather.write_feather(table, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, sidecar_path)
+            print(f"💾 Wrote columnar cache {sidecar_path}")
+        except Exception as e:
+            print(f"⚠️ Could not write columnar cache {sidecar_path}: {e}")
+    
+    def _read_transactions(self, path):
+        """
+        Parse the transactions CSV with the declared schema: categorical UPI
+        IDs, datetime64 timestamps, float32 features and int8 flags/labels.
+        Only the configured columns are read (all of them if set to None).
+        """
+        header = pd.read_csv(path, nrows=0).columns
+        if self.transaction_columns is not None:
+            missing = [c for c in self.transaction_columns if c not in header]
+            if missing:
+                raise ValueError(f"Unknown transaction columns in {os.path.basename(path)}: {', '.join(missing)}")
+        columns = [c for c in header if self.transaction_columns is None or c in self.transaction_columns]
+        dtypes = {c: TRANSACTION_SCHEMA[c] for c in columns if c in TRANSACTION_SCHEMA}
+        
+        return pd.read_csv(
+            path,
+            engine=resolve_csv_engine(self.csv_engine),
+            usecols=columns,
+            dtype=dtypes,
+            parse_dates=['timestamp'] if 'timestamp' in columns else None,
+        )
+    
     def load_data(self):
         """Load CSV data on first access."""
         if self._loaded:
@@ -26,25 +215,90 @@ class DataService:
             transactions_path = os.path.join(base_dir, "upi_transactions.csv")
             
             if os.path.exists(users_path):
-                self.users_df = pd.read_csv(users_path)
+                self.users_df = self._load_table(users_path, pd.read_csv, variant='users')
                 print(f"✅ Loaded {len(self.users_df)} users from {users_path}")
             else:
                 print(f"⚠️ Users file not found: {users_path}")
                 self.users_df = pd.DataFrame()
             
+            self._build_user_index()
+            
             if os.path.exists(transactions_path):
-                self.transactions_df = pd.read_csv(transactions_path)
+                self.transactions_df = self._load_table(
+                    transactions_path,
+                    self._read_transactions,
+                    variant=json.dumps({'columns': self.transaction_columns, 'schema': TRANSACTION_SCHEMA}, default=str),
+                )
                 print(f"✅ Loaded {len(self.transactions_df)} transactions from {transactions_path}")
             else:
                 print(f"⚠️ Transactions file not found: {transactions_path}")
                 self.transactions_df = pd.DataFrame()
             
+            self._build_velocity_index()
+            
             self._loaded = True
             
         except Exception as e:
             print(f"❌ Error loading data: {e}")
             self.users_df = pd.DataFrame()
             self.transactions_df = pd.DataFrame()
+            self.users_by_upi = {}
+            self.search_index = UserSearchIndex()
+            self.tx_times_by_upi = {}
+    
+    def _build_user_index(self):
+        """
+        Build the upi_id -> profile record index used by get_user_by_upi and
+        the recipient search index. Records are cleaned once here (NaN -> None
+        for JSON serialization); the first row wins for duplicate UPI IDs.
+        """
+        self.users_by_upi = {}
+        self.search_index = UserSearchIndex()
+        
+        if self.users_df.empty:
+            return
+        
+        clean_df = self.users_df.astype(object).where(self.users_df.notna(), None)
+        records = clean_df.to_dict('records')
+        for record in records:
+            self.users_by_upi.setdefault(record['upi_id'], record)
+        
+        self.search_index = UserSearchIndex.from_records(records)
+    
+    def _build_velocity_index(self):
+        """
+        Build the upi_id -> sorted int64 epoch-ns timestamp index used by the
+        velocity features. Sender and receiver sides are merged (a row where
+        the user is both counts once) and unparseable timestamps are dropped.
+        """
+        self.tx_times_by_upi = {}
+        
+        if self.transactions_df.empty:
+            return
+        
+        timestamps = self.transactions_df['timestamp']
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps)
+        
+        senders = self.transactions_df['sender_upi_id'].to_numpy(dtype=object)
+        receivers = self.transactions_df['receiver_upi_id'].to_numpy(dtype=object)
+        times = timestamps.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        valid = ~pd.isna(timestamps).to_numpy()
+        receiver_side = valid & (receivers != senders)
+        
+        upis = np.concatenate([senders[valid], receivers[receiver_side]])
+        times = np.concatenate([times[valid], times[receiver_side]])
+        if len(upis) == 0:
+            return
+        
+        # Group by UPI ID (codes), timestamps ascending within each group
+        codes, uniques = pd.factorize(upis)
+        order = np.lexsort((times, codes))
+        codes, times = codes[order], times[order]
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        
+        for group_codes, group_times in zip(np.split(codes, boundaries), np.split(times, boundaries)):
+            self.tx_times_by_upi[uniques[group_codes[0]]] = group_times
     
     def get_user_by_upi(self, upi_id):
         """
@@ -53,21 +307,12 @@ class DataService:
         """
         self.load_data()
         
-        if self.users_df.empty:
+        user = self.users_by_upi.get(upi_id)
+        if user is None:
             return None
         
-        matches = self.users_df[self.users_df['upi_id'] == upi_id]
-        if len(matches) == 0:
-            return None
-        
-        user = matches.iloc[0].to_dict()
-        
-        # Convert NaN to None for JSON serialization
-        for key, value in user.items():
-            if pd.isna(value):
-                user[key] = None
-        
-        return user
+        # Callers get their own copy of the indexed record
+        return dict(user)
     
     def get_all_users(self):
         """Get all users for frontend autocomplete."""
@@ -97,20 +342,20 @@ class DataService:
         return history.to_dict('records')
     
     def search_users(self, query, limit=10):
-        """Search users by UPI ID or display name."""
+        """Search users by UPI ID or display name (ranked prefix/infix match)."""
         self.load_data()
         
-        if self.users_df.empty or not query:
-            return []
-        
-        query_lower = query.lower()
-        
-        mask = self.users_df['upi_id'].str.lower().str.contains(query_lower, na=False) | \
-               self.users_df['display_name'].str.lower().str.contains(query_lower, na=False)
-        
-        results = self.users_df[mask].head(limit)
+        return [dict(record) for record in self.search_index.search(query, limit)]
+    
+    def index_search_user(self, record):
+        """
+        Add or update a user in the recipient search index, e.g. when a user
+        registers or is provisioned into the DB. Needs upi_id and display_name;
+        verification_status and risk_category are returned with search hits.
+        """
+        self.load_data()
         
-        return results[['upi_id', 'display_name', 'verification_status', 'risk_category']].to_dict('records')
+        self.search_index.add(record)
     
     def get_user_stats(self, upi_id):
         """
@@ -143,26 +388,12 @@ class DataService:
         """
         self.load_data()
         
-        if self.transactions_df.empty:
+        times = self.tx_times_by_upi.get(upi_id)
+        if times is None:
             return 0
-            
-        # Filter for this user
-        user_txs = self.transactions_df[
-            (self.transactions_df['sender_upi_id'] == upi_id) | 
-            (self.transactions_df['receiver_upi_id'] == upi_id)
-        ].copy()
         
-        if user_txs.empty:
-            return 0
-            
-        # Convert timestamp to datetime if not already
-        if not pd.api.types.is_datetime64_any_dtype(user_txs['timestamp']):
-            user_txs['timestamp'] = pd.to_datetime(user_txs['timestamp'])
-            
-        cutoff_time = pd.Timestamp.now() - pd.Timedelta(hours=hours)
-        recent_txs = user_txs[user_txs['timestamp'] >= cutoff_time]
-        
-        return len(recent_txs)
+        cutoff = (pd.Timestamp.now() - pd.Timedelta(hours=hours)).value
+        return int(len(times) - np.searchsorted(times, cutoff, side='left'))
 
     def get_time_since_last_transaction(self, upi_id):
         """
@@ -170,22 +401,11 @@ class DataService:
         """
         self.load_data()
         
-        if self.transactions_df.empty:
+        times = self.tx_times_by_upi.get(upi_id)
+        if times is None:
             return 24.0 # Default to 1 day if no history
-            
-        user_txs = self.transactions_df[
-            (self.transactions_df['sender_upi_id'] == upi_id) | 
-            (self.transactions_df['receiver_upi_id'] == upi_id)
-        ].copy()
         
-        if user_txs.empty:
-            return 24.0
-            
-        if not pd.api.types.is_datetime64_any_dtype(user_txs['timestamp']):
-            user_txs['timestamp'] = pd.to_datetime(user_txs['timestamp'])
-            
-        last_tx_time = user_txs['timestamp'].max()
-        hours_diff = (pd.Timestamp.now() - last_tx_time).total_seconds() / 3600.0
+        hours_diff = (pd.Timestamp.now().value - int(times[-1])) / 3.6e12
         
         return max(0, hours_diff)
     
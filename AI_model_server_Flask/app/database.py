@@ -1,10 +1,16 @@
 """
 Database Configuration and Initialization
+The database URL and engine profile come from Config (DATABASE_URL, DB_*,
+SQLITE_*). SQLite connections are tuned with pragmas on connect (WAL,
+synchronous=NORMAL, mmap, page cache, busy timeout); server databases such
+as PostgreSQL get a sized connection pool with pre-ping.
 """
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 import os
 
 # Initialize extensions
@@ -12,21 +18,75 @@ db = SQLAlchemy()
 migrate = Migrate()
 
 
+def default_database_url():
+    basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+    return f"sqlite:///{os.path.join(basedir, 'safepay.db')}"
+
+
+def engine_options(app: Flask, url):
+    """SQLAlchemy create_engine() options for the configured database."""
+    config = app.config
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return options  # Flask-SQLAlchemy uses a static pool for in-memory databases
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            # pysqlite's own lock wait, in seconds (busy_timeout pragma is set too)
+            connect_args={'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000.0},
+        )
+    else:
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_recycle=config['DB_POOL_RECYCLE'],
+        )
+    return options
+
+
+def sqlite_pragmas(app: Flask):
+    """PRAGMA statements run on every new SQLite connection."""
+    config = app.config
+    return [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA cache_size={int(config['SQLITE_CACHE_SIZE'])}",
+    ]
+
+
 def init_db(app: Flask):
     """Initialize database with the Flask app."""
     # Database configuration
-    basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
-    db_path = os.path.join(basedir, 'safepay.db')
+    database_url = app.config.get('DATABASE_URL') or default_database_url()
+    url = make_url(database_url)
     
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SQLALCHEMY_ECHO'] = False  # Set to True for SQL debugging
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app, url))
     
     # Initialize extensions with app
     db.init_app(app)
     migrate.init_app(app, db)
     
-    print(f"📦 Database configured at {db_path}")
+    if url.get_backend_name() == 'sqlite':
+        pragmas = sqlite_pragmas(app)
+        
+        with app.app_context():
+            @event.listens_for(db.engine, 'connect')
+            def apply_sqlite_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+                cursor.close()
+    
+    print(f"📦 Database configured at {url.render_as_string(hide_password=True)}")
     
     return db
 
@@ -36,4 +96,3 @@ def create_tables(app: Flask):
     with app.app_context():
         db.create_all()
         print("✅ Database tables created")
-
@@ -0,0 +1,205 @@
+"""
+Feature Pipeline
+Builds the 22 normalized model features from raw transaction values.
+Shared by /predict/transaction, /predict/batch, /api/transactions/send and
+the synthetic data generator so every path applies identical scaling and
+one-hot encoding, as NumPy operations over a whole batch.
+"""
+
+import json
+import os
+import numpy as np
+
+# Feature order expected by the model (matches the norm_f* columns in upi_transactions.csv)
+FEATURE_NAMES = [
+    'norm_f1_amount',
+    'norm_f2_frequency',
+    'norm_f3_blacklist',
+    'norm_f4_device',
+    'norm_f5_vpn',
+    'norm_f6_biometrics',
+    'norm_f7_time_since',
+    'norm_f8_trust',
+    'norm_f9_age',
+    'norm_f10_risk_time',
+    'norm_f11_past_fraud',
+    'norm_f12_location',
+    'norm_f13_norm_amount',
+    'norm_f14_context',
+    'norm_f15_complaints',
+    'norm_f16_mismatch',
+    'norm_f17_limit',
+    'norm_f18_high_value',
+    'norm_f19_suspicious',
+    'norm_f20_verified',
+    'norm_f21_geo_normal',
+    'norm_f22_geo_unusual',
+]
+
+# Normalization ranges from the original training data (min, max)
+NORM_RANGES = {
+    'transaction_amount': (0.005817, 4747.858107),
+    'transaction_frequency': (0, 13),
+    'behavioral_biometrics': (0.00004, 3.0),
+    'time_since_last': (0.000168, 29.997497),
+    'social_trust_score': (0.012724, 99.987487),
+    'account_age': (0.000975, 4.999239),
+    'normalized_amount': (0.000421, 1.256827),
+    'context_anomalies': (0.000095, 3.997015),
+    'fraud_complaints': (0, 5),
+}
+
+# How each feature is derived from the raw input fields:
+#   ('scale', field, range_key)   min-max scaled with NORM_RANGES[range_key]
+#   ('flag', field)               0/1 flag (any positive value -> 1)
+#   ('one_hot', field, values)    1 if the field is one of `values`
+FEATURE_SPECS = {
+    'norm_f1_amount': ('scale', 'amount', 'transaction_amount'),
+    'norm_f2_frequency': ('scale', 'frequency', 'transaction_frequency'),
+    'norm_f3_blacklist': ('flag', 'blacklist'),
+    'norm_f4_device': ('flag', 'device'),
+    'norm_f5_vpn': ('flag', 'vpn'),
+    'norm_f6_biometrics': ('scale', 'biometrics', 'behavioral_biometrics'),
+    'norm_f7_time_since': ('scale', 'time_since', 'time_since_last'),
+    'norm_f8_trust': ('scale', 'trust', 'social_trust_score'),
+    'norm_f9_age': ('scale', 'age', 'account_age'),
+    'norm_f10_risk_time': ('flag', 'high_risk_time'),
+    'norm_f11_past_fraud': ('flag', 'past_fraud'),
+    'norm_f12_location': ('flag', 'location'),
+    'norm_f13_norm_amount': ('scale', 'norm_amount', 'normalized_amount'),
+    'norm_f14_context': ('scale', 'context', 'context_anomalies'),
+    'norm_f15_complaints': ('scale', 'complaints', 'fraud_complaints'),
+    'norm_f16_mismatch': ('flag', 'mismatch'),
+    'norm_f17_limit': ('flag', 'limit'),
+    'norm_f18_high_value': ('flag', 'high_value'),
+    # drop_first removed 'recently_registered' / 'high-risk' in training
+    'norm_f19_suspicious': ('one_hot', 'verification_status', ('suspicious', 'suspended')),
+    'norm_f20_verified': ('one_hot', 'verification_status', ('verified',)),
+    'norm_f21_geo_normal': ('one_hot', 'geo_flag', ('normal',)),
+    'norm_f22_geo_unusual': ('one_hot', 'geo_flag', ('unusual',)),
+}
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def is_high_risk_hour(hour):
+    """Late-night transactions (23:00-05:59) are flagged as high-risk times."""
+    hour = np.asarray(hour)
+    return ((hour >= 23) | (hour <= 5)).astype(np.int8)
+
+
+def amount_ratio(amount):
+    """Raw 'normalized amount' feature: amount relative to 5000, capped at 1.26."""
+    return np.minimum(np.asarray(amount, dtype=np.float64) / 5000, 1.26)
+
+
+class FeaturePipeline:
+    """
+    Vectorized builder for the model's feature matrix.
+
+    Raw input fields (scalars or equal-length arrays):
+      amount, frequency, blacklist, device, vpn, biometrics, time_since,
+      trust, age (years), past_fraud, location, context, complaints,
+      mismatch, verification_status, geo_flag
+    Optional fields derived from amount/hour when absent:
+      high_risk_time (from hour), norm_amount, limit (> 100000),
+      high_value (> 50000)
+    """
+
+    def __init__(self, feature_names=FEATURE_NAMES, norm_ranges=NORM_RANGES):
+        unknown = [name for name in feature_names if name not in FEATURE_SPECS]
+        if unknown:
+            raise ValueError(f"Unknown model features: {', '.join(unknown)}")
+
+        self.feature_names = list(feature_names)
+        self.norm_ranges = {key: tuple(bounds) for key, bounds in norm_ranges.items()}
+
+        # Scaled features are normalized together as one (rows x k) block
+        self._scaled_columns = []
+        self._scaled_fields = []
+        lows, spans = [], []
+        for column, name in enumerate(self.feature_names):
+            spec = FEATURE_SPECS[name]
+            if spec[0] == 'scale':
+                low, high = self.norm_ranges[spec[2]]
+                self._scaled_columns.append(column)
+                self._scaled_fields.append(spec[1])
+                lows.append(low)
+                # A degenerate range scales everything to 0
+                spans.append(np.inf if high == low else high - low)
+        self._lows = np.asarray(lows, dtype=np.float64)
+        self._spans = np.asarray(spans, dtype=np.float64)
+
+    @classmethod
+    def from_manifest(cls, path):
+        """Load feature order and ranges from a model artifact manifest (file or artifact directory)."""
+        if os.path.isdir(path):
+            path = os.path.join(path, MANIFEST_FILE)
+        with open(path) as file:
+            manifest = json.load(file)
+        return cls(manifest['feature_names'], manifest['norm_ranges'])
+
+    def init_app(self, app):
+        """Use the feature order and ranges from the exported model manifest when one exists."""
+        artifact_path = app.config.get('MODEL_ARTIFACT_PATH')
+        if artifact_path and os.path.exists(os.path.join(artifact_path, MANIFEST_FILE)):
+            loaded = self.from_manifest(artifact_path)
+            self.__dict__.update(loaded.__dict__)
+            print(f"📐 Feature pipeline loaded from {artifact_path}")
+
+    def build(self, raw, clip=True):
+        """
+        Build an (n, 22) float64 feature matrix from a dict of raw fields.
+        With clip=True scaled values are clamped to [0, 1] (serving);
+        the synthetic generator uses clip=False to match its training data.
+        """
+        raw = self._with_derived_fields(raw)
+        n_rows = max((np.size(value) for value in raw.values()), default=0)
+        features = np.zeros((n_rows, len(self.feature_names)), dtype=np.float64)
+
+        if self._scaled_columns:
+            block = np.column_stack([
+                np.broadcast_to(np.asarray(raw[field], dtype=np.float64), n_rows)
+                for field in self._scaled_fields
+            ])
+            block = (block - self._lows) / self._spans
+            if clip:
+                np.clip(block, 0.0, 1.0, out=block)
+            features[:, self._scaled_columns] = block
+
+        for column, name in enumerate(self.feature_names):
+            spec = FEATURE_SPECS[name]
+            if spec[0] == 'flag':
+                values = np.asarray(raw[spec[1]], dtype=np.float64)
+                features[:, column] = values > 0
+            elif spec[0] == 'one_hot':
+                features[:, column] = np.isin(np.asarray(raw[spec[1]], dtype=object), spec[2])
+
+        return features
+
+    def build_records(self, records, clip=True):
+        """Build the feature matrix for a list of raw-field dicts."""
+        if not records:
+            return np.zeros((0, len(self.feature_names)), dtype=np.float64)
+        fields = set().union(*records)
+        return self.build({field: [record.get(field) for record in records] for field in fields}, clip=clip)
+
+    def build_row(self, raw, clip=True):
+        """Build the 22-feature list for a single transaction."""
+        return self.build(raw, clip=clip)[0].tolist()
+
+    @staticmethod
+    def _with_derived_fields(raw):
+        raw = dict(raw)
+        if 'high_risk_time' not in raw and 'hour' in raw:
+            raw['high_risk_time'] = is_high_risk_hour(raw['hour'])
+        if 'amount' in raw:
+            amount = np.asarray(raw['amount'], dtype=np.float64)
+            raw.setdefault('norm_amount', amount_ratio(amount))
+            raw.setdefault('limit', (amount > 100000).astype(np.int8))
+            raw.setdefault('high_value', (amount > 50000).astype(np.int8))
+        return raw
+
+
+# Singleton instance
+feature_pipeline = FeaturePipeline()
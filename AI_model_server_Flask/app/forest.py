@@ -0,0 +1,221 @@
+"""
+Compiled Random Forest Evaluator
+Flattens a fitted sklearn forest into packed NumPy arrays and evaluates
+all trees for all rows with a vectorized traversal (no sklearn at predict time).
+Compiled forests can be exported as a directory of .npy arrays plus a JSON
+manifest and opened with mmap, so worker processes share the pages.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+
+ARTIFACT_FORMAT = 'safepay-compiled-forest'
+ARTIFACT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+ARRAY_NAMES = ('feature', 'threshold', 'children', 'value', 'roots')
+
+
+class CompiledForest:
+    """
+    Array-backed forest exposing the predict_proba / predict / classes_
+    interface used by FraudDetectionService.
+
+    Nodes of every tree are stored back to back in shared arrays:
+      feature    int32   split feature (0 for leaves)
+      threshold  float64 split threshold (go left when x <= threshold)
+      children   int32   (left, right) global child indices, interleaved;
+                         leaves point to themselves
+      value      float64 per-node class probabilities
+      roots      int32   global index of each tree's root node
+    """
+
+    # Rows evaluated per traversal pass; keeps the (rows x trees) working set cache-sized
+    CHUNK_ROWS = 256
+
+    def __init__(self, feature, threshold, children, value, roots, classes, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = None
+        self.manifest = None
+
+    @classmethod
+    def from_estimator(cls, model):
+        """Build from a fitted sklearn RandomForestClassifier (or any forest of decision tree classifiers)."""
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves so every row can take max_depth steps
+            left = np.where(is_leaf, node_ids, tree.children_left).astype(np.int32) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right).astype(np.int32) + offset
+
+            # Normalised leaf distributions, as sklearn's tree predict_proba does
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0.0] = 1.0
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            children.append(np.stack([left, right], axis=1).ravel())
+            values.append(value / totals)
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        forest = cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=model.classes_,
+            max_depth=max_depth,
+        )
+        forest.n_features_in_ = getattr(model, 'n_features_in_', None)
+        return forest
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Open an exported artifact directory.
+        With mmap=True the arrays are read-only views of the page cache, so
+        every worker on the host shares a single copy of the trees.
+        """
+        with open(os.path.join(path, MANIFEST_FILE)) as file:
+            manifest = json.load(file)
+
+        if manifest.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"{path} is not a compiled forest artifact")
+        if manifest.get('format_version') != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported artifact version {manifest.get('format_version')} (expected {ARTIFACT_VERSION})")
+
+        arrays = {}
+        for name in ARRAY_NAMES:
+            spec = manifest['arrays'][name]
+            array = np.load(os.path.join(path, spec['file']), mmap_mode='r' if mmap else None)
+            if str(array.dtype) != spec['dtype'] or list(array.shape) != spec['shape']:
+                raise ValueError(f"Artifact array '{name}' does not match its manifest entry")
+            arrays[name] = array
+
+        forest = cls(classes=manifest['classes'], max_depth=manifest['max_depth'], **arrays)
+        forest.n_features_in_ = manifest['n_features']
+        forest.manifest = manifest
+        return forest
+
+    def save(self, path, **metadata):
+        """
+        Export as <path>/{feature,threshold,children,value,roots}.<version>.npy
+        plus manifest.json. Extra keyword arguments (feature names,
+        normalization ranges, source model info) are stored in the manifest.
+
+        Safe while workers have the current artifact memory-mapped: array
+        files are versioned by content and never rewritten in place, the
+        manifest is swapped atomically last, and superseded files are only
+        unlinked (mapped pages stay valid), keeping the previous generation
+        for loaders that read the old manifest a moment ago.
+        """
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        previous_files = set()
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path) as file:
+                    previous_files = {spec['file'] for spec in json.load(file).get('arrays', {}).values()}
+            except (OSError, ValueError, AttributeError):
+                pass
+
+        contiguous = {name: np.ascontiguousarray(getattr(self, name)) for name in ARRAY_NAMES}
+        digest = hashlib.sha256()
+        for name in ARRAY_NAMES:
+            digest.update(name.encode())
+            digest.update(contiguous[name].tobytes())
+        version = digest.hexdigest()[:16]
+
+        arrays = {}
+        for name in ARRAY_NAMES:
+            array = contiguous[name]
+            filename = f"{name}.{version}.npy"
+            tmp_path = os.path.join(path, f"{filename}.{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as file:
+                np.save(file, array)
+            os.replace(tmp_path, os.path.join(path, filename))
+            arrays[name] = {'file': filename, 'dtype': str(array.dtype), 'shape': list(array.shape)}
+
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'format_version': ARTIFACT_VERSION,
+            'n_features': self.n_features_in_,
+            'n_trees': self.n_estimators,
+            'n_nodes': int(len(self.feature)),
+            'max_depth': self.max_depth,
+            'classes': self.classes_.tolist(),
+            'arrays': arrays,
+            **metadata,
+        }
+
+        tmp_path = os.path.join(path, f"{MANIFEST_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(tmp_path, manifest_path)
+        self.manifest = manifest
+
+        # Drop array files older than the previous generation
+        keep = previous_files | {spec['file'] for spec in arrays.values()}
+        for filename in os.listdir(path):
+            if filename.endswith('.npy') and filename.split('.')[0] in ARRAY_NAMES and filename not in keep:
+                try:
+                    os.remove(os.path.join(path, filename))
+                except OSError:
+                    pass  # e.g. still mapped on Windows; removed by a later export
+        return manifest
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_rows, n_trees)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2:
+            raise ValueError(f"Expected a 2-D feature matrix, got {X.ndim} dimension(s)")
+        if self.n_features_in_ is not None and X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features_in_}")
+
+        if X.shape[0] <= self.CHUNK_ROWS:
+            return self._apply_chunk(X)
+        return np.concatenate([
+            self._apply_chunk(X[start:start + self.CHUNK_ROWS])
+            for start in range(0, X.shape[0], self.CHUNK_ROWS)
+        ])
+
+    def _apply_chunk(self, X):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        nodes = np.repeat(self.roots[None, :].astype(np.int64), n_rows, axis=0)
+        for _ in range(self.max_depth):
+            go_right = ~(flat[row_offsets + self.feature[nodes]] <= self.threshold[nodes])
+            nodes = self.children[2 * nodes + go_right]
+        return nodes
+
+    def predict_proba(self, X):
+        """Average of the per-tree leaf class probabilities."""
+        leaves = self.apply(X)
+        return self.value[leaves].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
@@ -1,11 +1,15 @@
 """
 SQLAlchemy Models for SafePay AI Production System
-Defines User, Transaction, FraudAlert, and UserRiskProfile tables.
+Defines User, Transaction, FraudAlert, UserRiskProfile, UserVelocity, SystemCounters,
+and OutboxEvent tables.
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import select, union_all, update
+from sqlalchemy.exc import IntegrityError
 from app.database import db
 import enum
+import random
 import uuid
 
 
@@ -97,6 +101,11 @@ class User(db.Model):
 class Transaction(db.Model):
     """Transaction record model."""
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Per-party history in time order (see for_user)
+        db.Index('ix_transactions_sender_created', 'sender_id', 'created_at'),
+        db.Index('ix_transactions_receiver_created', 'receiver_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     transaction_ref = db.Column(db.String(32), unique=True, nullable=False, index=True)
@@ -134,6 +143,65 @@ class Transaction(db.Model):
     def __repr__(self):
         return f'<Transaction {self.transaction_ref}>'
     
+    # ------------------------------------------------------------------
+    # Sender-or-receiver queries
+    #
+    # "sender_id = X OR receiver_id = X ORDER BY created_at" cannot use an
+    # index, so these run one range scan per party index and merge the two
+    # branches with UNION ALL. Self-transfers only come from the sender branch.
+    # ------------------------------------------------------------------
+    
+    @classmethod
+    def _party_filters(cls, user_id):
+        return (
+            (cls.sender_id == user_id,),
+            (cls.receiver_id == user_id, cls.sender_id != user_id),
+        )
+    
+    @classmethod
+    def for_user_ids(cls, user_id, *criteria, limit=None, offset=0):
+        """Subquery of (id, created_at) for the user's transactions, merged from both party indexes."""
+        branches = []
+        for party_filter in cls._party_filters(user_id):
+            branch = select(cls.id, cls.created_at).where(*party_filter, *criteria)
+            if limit is not None:
+                # Each branch only needs its own newest offset + limit rows
+                branch = branch.order_by(cls.created_at.desc(), cls.id.desc()).limit(offset + limit)
+            branches.append(select(branch.subquery()))
+        return union_all(*branches).subquery()
+    
+    @classmethod
+    def for_user(cls, user_id, *criteria, limit=None, offset=0):
+        """Query of transactions sent or received by the user, newest first."""
+        merged = cls.for_user_ids(user_id, *criteria, limit=limit, offset=offset)
+        query = cls.query.join(merged, cls.id == merged.c.id).order_by(cls.created_at.desc(), cls.id.desc())
+        if limit is not None:
+            query = query.offset(offset).limit(limit)
+        return query
+    
+    @classmethod
+    def before(cls, created_at, row_id):
+        """Keyset criterion: rows after (created_at, id) in newest-first order."""
+        return db.tuple_(cls.created_at, cls.id) < (created_at, row_id)
+    
+    @classmethod
+    def count_for_user(cls, user_id, *criteria):
+        """Number of transactions sent or received by the user."""
+        return sum(
+            db.session.execute(select(db.func.count()).where(*party_filter, *criteria)).scalar()
+            for party_filter in cls._party_filters(user_id)
+        )
+    
+    @classmethod
+    def last_created_at_for_user(cls, user_id):
+        """Timestamp of the user's most recent transaction, or None."""
+        latest = [
+            db.session.execute(select(db.func.max(cls.created_at)).where(*party_filter)).scalar()
+            for party_filter in cls._party_filters(user_id)
+        ]
+        latest = [value for value in latest if value is not None]
+        return max(latest) if latest else None
+    
     def to_dict(self):
         """Convert to dictionary for API responses."""
         return {
@@ -155,6 +223,10 @@ class Transaction(db.Model):
 class FraudAlert(db.Model):
     """Fraud alert for admin review."""
     __tablename__ = 'fraud_alerts'
+    __table_args__ = (
+        # Review queue in time order (keyset pagination)
+        db.Index('ix_fraud_alerts_reviewed_created', 'reviewed', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=False)
@@ -183,6 +255,11 @@ class FraudAlert(db.Model):
     def __repr__(self):
         return f'<FraudAlert {self.id} - {self.alert_type}>'
     
+    @classmethod
+    def before(cls, created_at, row_id):
+        """Keyset criterion: rows after (created_at, id) in newest-first order."""
+        return db.tuple_(cls.created_at, cls.id) < (created_at, row_id)
+    
     def to_dict(self):
         """Convert to dictionary for API responses."""
         return {
@@ -257,3 +334,238 @@ class UserRiskProfile(db.Model):
             return 'medium'
         else:
             return 'safe'
+
+
+class UserVelocity(db.Model):
+    """
+    Rolling per-user transaction velocity, maintained as transactions are written.
+    Hourly bucket counts for the last VELOCITY_WINDOW_HOURS hours are kept as
+    {hour_index: count} JSON so the fraud check reads one row instead of
+    scanning transaction history.
+    """
+    __tablename__ = 'user_velocity'
+    
+    VELOCITY_WINDOW_HOURS = 24
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    hourly_counts = db.Column(db.JSON, default=dict)
+    last_tx_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserVelocity user_id={self.user_id}>'
+    
+    @staticmethod
+    def hour_index(when):
+        """Hours since the epoch for a naive UTC datetime."""
+        return int((when - datetime(1970, 1, 1)) // timedelta(hours=1))
+    
+    def record(self, when):
+        """Count one transaction at `when` and drop buckets that left the window."""
+        bucket = self.hour_index(when)
+        oldest = bucket - self.VELOCITY_WINDOW_HOURS
+        
+        # Assign a new dict so SQLAlchemy sees the JSON change
+        counts = {key: value for key, value in (self.hourly_counts or {}).items() if int(key) >= oldest}
+        counts[str(bucket)] = counts.get(str(bucket), 0) + 1
+        self.hourly_counts = counts
+        
+        if self.last_tx_at is None or when > self.last_tx_at:
+            self.last_tx_at = when
+    
+    def count_since(self, now, hours=24):
+        """
+        Transactions in the last `hours` hours, to hour-bucket granularity.
+        The partially elapsed oldest bucket is excluded, so the count covers
+        between hours - 1 and hours hours and never reaches outside the window.
+        """
+        oldest = self.hour_index(now - timedelta(hours=hours)) + 1
+        return sum(value for key, value in (self.hourly_counts or {}).items() if int(key) >= oldest)
+    
+    @classmethod
+    def from_history(cls, user_id, now=None):
+        """Build an (unsaved) velocity row from the user's existing transactions."""
+        now = now or datetime.utcnow()
+        
+        velocity = cls(user_id=user_id, hourly_counts={})
+        cutoff = now - timedelta(hours=cls.VELOCITY_WINDOW_HOURS)
+        recent = Transaction.for_user_ids(user_id, Transaction.created_at >= cutoff)
+        for (created_at,) in db.session.execute(select(recent.c.created_at)):
+            velocity.record(created_at)
+        
+        velocity.last_tx_at = Transaction.last_created_at_for_user(user_id)
+        return velocity
+    
+    @classmethod
+    def record_transaction(cls, transaction):
+        """
+        Update sender and receiver velocity for a flushed transaction, in the
+        same session (and so the same commit) as the transaction itself.
+        Existing rows are locked (SELECT ... FOR UPDATE, in user_id order) and
+        re-read, so concurrent payments don't overwrite each other's JSON
+        counts. Missing rows are backfilled from history, which already includes
+        it; if a concurrent payment inserts the row first, this one falls back
+        to the locked update instead of failing at commit.
+        """
+        when = transaction.created_at or datetime.utcnow()
+        for user_id in sorted({transaction.sender_id, transaction.receiver_id}):
+            velocity = db.session.get(cls, user_id, with_for_update=True, populate_existing=True)
+            if velocity is None:
+                try:
+                    with db.session.begin_nested():
+                        db.session.add(cls.from_history(user_id, when))
+                    continue
+                except IntegrityError:
+                    # The other insert's history can't include this uncommitted transaction
+                    velocity = db.session.get(cls, user_id, with_for_update=True, populate_existing=True)
+            velocity.record(when)
+
+
+class SystemCounters(db.Model):
+    """
+    System-wide totals served by /api/admin/stats, sharded over SHARD_COUNT rows.
+    Writers bump one random shard with increment() inside their own
+    transaction, so concurrent payments don't queue on a single row lock;
+    get() sums every row. reconcile() corrects drift by rewriting only the
+    base row (BASE_SHARD), which increment() never touches.
+    """
+    __tablename__ = 'system_counters'
+    
+    BASE_SHARD = 0
+    SHARD_COUNT = 16
+    COUNTER_NAMES = ('total_users', 'suspended_users', 'total_transactions', 'blocked_transactions', 'pending_alerts')
+    
+    id = db.Column(db.Integer, primary_key=True)  # BASE_SHARD, or shard number 1..SHARD_COUNT
+    total_users = db.Column(db.Integer, nullable=False, default=0)
+    suspended_users = db.Column(db.Integer, nullable=False, default=0)
+    total_transactions = db.Column(db.Integer, nullable=False, default=0)
+    blocked_transactions = db.Column(db.Integer, nullable=False, default=0)
+    pending_alerts = db.Column(db.Integer, nullable=False, default=0)
+    
+    reconciled_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SystemCounters transactions={self.total_transactions}>'
+    
+    def to_dict(self):
+        """Convert to dictionary for API responses."""
+        data = {name: getattr(self, name) for name in self.COUNTER_NAMES}
+        data['reconciled_at'] = self.reconciled_at.isoformat() if self.reconciled_at else None
+        return data
+    
+    @classmethod
+    def get(cls):
+        """Totals summed over the shards (an unsaved instance), or None before the first reconcile."""
+        row = db.session.execute(
+            select(
+                db.func.count(cls.id),
+                db.func.max(cls.reconciled_at),
+                *(db.func.coalesce(db.func.sum(getattr(cls, name)), 0) for name in cls.COUNTER_NAMES),
+            )
+        ).one()
+        shards, reconciled_at, *totals = row
+        if not shards:
+            return None
+        return cls(reconciled_at=reconciled_at, **dict(zip(cls.COUNTER_NAMES, totals)))
+    
+    @classmethod
+    def increment(cls, **deltas):
+        """
+        Atomically add deltas (e.g. total_transactions=1) to a random shard in
+        the current session. The UPDATE is evaluated by the database
+        (col = col + delta), so concurrent writers never lose increments; it
+        commits with the caller.
+        """
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        values = {getattr(cls, name): getattr(cls, name) + delta for name, delta in deltas.items()}
+        for shard in (random.randint(1, cls.SHARD_COUNT), cls.BASE_SHARD):
+            result = db.session.execute(
+                update(cls)
+                .where(cls.id == shard)
+                .values(values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                return  # Otherwise the shard isn't created yet (before the first reconcile)
+    
+    @classmethod
+    def source_counts(cls):
+        """Scalar subqueries counting each total from its source table."""
+        def count(model, *criteria):
+            return select(db.func.count()).select_from(model).where(*criteria).scalar_subquery()
+        
+        return {
+            'total_users': count(User),
+            'suspended_users': count(User, User.verification_status == VerificationStatus.SUSPENDED),
+            'total_transactions': count(Transaction),
+            'blocked_transactions': count(Transaction, Transaction.status == TransactionStatus.BLOCKED),
+            'pending_alerts': count(FraudAlert, FraudAlert.reviewed == False),  # noqa: E712
+        }
+    
+    @classmethod
+    def reconcile(cls):
+        """
+        Recompute every counter from the source tables (creating missing
+        shards) and commit. One UPDATE sets the base row to the source count
+        minus the other shards, both read from the same statement snapshot,
+        so increments committed concurrently stay in their shards and are
+        neither lost nor counted twice. Returns the corrected totals.
+        """
+        existing = set(db.session.execute(select(cls.id)).scalars())
+        missing = [cls(id=shard) for shard in range(cls.BASE_SHARD, cls.SHARD_COUNT + 1) if shard not in existing]
+        if missing:
+            db.session.add_all(missing)
+            db.session.flush()
+        
+        shards = db.aliased(cls)
+        def other_shards(name):
+            column = getattr(shards, name)
+            return select(db.func.coalesce(db.func.sum(column), 0)).where(shards.id != cls.BASE_SHARD).scalar_subquery()
+        
+        db.session.execute(
+            update(cls)
+            .where(cls.id == cls.BASE_SHARD)
+            .values(
+                reconciled_at=datetime.utcnow(),
+                **{name: source - other_shards(name) for name, source in cls.source_counts().items()},
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        
+        return cls.get()
+
+
+class OutboxEvent(db.Model):
+    """
+    Transactional outbox entry: a side effect recorded in the same commit as
+    the write that caused it and carried out afterwards by app.outbox.
+    """
+    __tablename__ = 'outbox_events'
+    __table_args__ = (
+        db.Index('ix_outbox_events_status_id', 'status', 'id'),
+    )
+    
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    
+    # Delivery state
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    claimed_at = db.Column(db.DateTime, nullable=True)  # Lease held by a dispatcher
+    last_error = db.Column(db.Text, nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<OutboxEvent {self.id} {self.event_type} {self.status}>'
@@ -0,0 +1,272 @@
+"""
+Transactional Outbox
+Side effects of a write (alert fan-out, risk-profile aggregates, WebSocket
+notifications) are recorded as OutboxEvent rows in the same commit and
+dispatched afterwards, so they stay off the request's critical path but are
+never lost if the process dies after the commit.
+"""
+
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from app.database import db
+from app.models import OutboxEvent, FraudAlert, Transaction, UserRiskProfile, SystemCounters, AlertSeverity
+
+
+class Outbox:
+    """
+    Handler registry plus dispatcher for OutboxEvent rows.
+
+    - enqueue() adds an event to the caller's session (commits with it).
+    - dispatch_pending() claims pending events with a leased UPDATE (safe with
+      several workers), runs the handlers and marks them done; failures are
+      retried after the lease (OUTBOX_LEASE_SECONDS) expires, up to
+      OUTBOX_MAX_ATTEMPTS, then marked failed.
+    - With OUTBOX_WORKER_ENABLED a background task drains the table; notify()
+      wakes it after a commit. Otherwise notify(event_ids) dispatches just the
+      caller's events inline; anything left pending is retried by the next
+      dispatch_pending().
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.app = None
+        self.worker_enabled = False
+        self.poll_interval = 1.0
+        self.batch_size = 100
+        self.max_attempts = 5
+        self.lease = timedelta(seconds=60)
+        self._wakeup = threading.Event()
+        self._worker_started = False
+
+    def init_app(self, app):
+        """Read outbox settings and start the background worker if enabled."""
+        self.app = app
+        self.worker_enabled = app.config.get('OUTBOX_WORKER_ENABLED', True)
+        self.poll_interval = app.config.get('OUTBOX_POLL_INTERVAL', 1.0)
+        self.batch_size = app.config.get('OUTBOX_BATCH_SIZE', 100)
+        self.max_attempts = app.config.get('OUTBOX_MAX_ATTEMPTS', 5)
+        self.lease = timedelta(seconds=app.config.get('OUTBOX_LEASE_SECONDS', 60))
+
+        if self.worker_enabled and not self._worker_started:
+            from app import socketio
+            self._worker_started = True
+            socketio.start_background_task(self._run)
+            print("📮 Outbox worker started")
+
+    def handler(self, event_type):
+        """Decorator registering a handler(payload) for an event type."""
+        def register(fn):
+            self.handlers.setdefault(event_type, []).append(fn)
+            return fn
+        return register
+
+    def enqueue(self, event_type, payload):
+        """Record an event in the current session; it is dispatched after commit."""
+        if event_type not in self.handlers:
+            raise ValueError(f"No outbox handler registered for '{event_type}'")
+        event = OutboxEvent(event_type=event_type, payload=payload)
+        db.session.add(event)
+        return event
+
+    def notify(self, event_ids=None):
+        """
+        Call after committing enqueued events. Never raises: the caller's
+        write is already committed and its events stay pending on failure.
+        """
+        if self.worker_enabled:
+            self._wakeup.set()
+            return
+        try:
+            if event_ids is None:
+                self.dispatch_pending()
+            else:
+                self.dispatch(event_ids)
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Outbox inline dispatch failed: {e}")
+
+    def dispatch(self, event_ids):
+        """Claim and dispatch the given events (e.g. the ones a request just enqueued)."""
+        dispatched = 0
+        for event_id in event_ids:
+            if self._claim(event_id):
+                self._dispatch(event_id)
+                dispatched += 1
+        return dispatched
+
+    def dispatch_pending(self, limit=None):
+        """Claim and dispatch up to `limit` pending events. Returns the number dispatched."""
+        candidate_ids = db.session.execute(
+            select(OutboxEvent.id)
+            .where(*self._claimable(datetime.utcnow()))
+            .order_by(OutboxEvent.id)
+            .limit(limit or self.batch_size)
+        ).scalars().all()
+        db.session.commit()
+
+        return self.dispatch(candidate_ids)
+
+    def _claimable(self, now):
+        """Pending events that are unclaimed or whose lease has expired."""
+        return (
+            OutboxEvent.status == OutboxEvent.STATUS_PENDING,
+            OutboxEvent.claimed_at.is_(None) | (OutboxEvent.claimed_at < now - self.lease),
+        )
+
+    def _claim(self, event_id):
+        now = datetime.utcnow()
+        result = db.session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id == event_id, *self._claimable(now))
+            .values(claimed_at=now, attempts=OutboxEvent.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _dispatch(self, event_id):
+        event = db.session.get(OutboxEvent, event_id, populate_existing=True)
+        try:
+            for fn in self.handlers.get(event.event_type, []):
+                fn(event.payload)
+            event.status = OutboxEvent.STATUS_DONE
+            event.processed_at = datetime.utcnow()
+            event.last_error = None
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            traceback.print_exc()
+            event = db.session.get(OutboxEvent, event_id)
+            event.last_error = str(e)
+            # The lease is kept, so the retry happens once it expires
+            if event.attempts >= self.max_attempts:
+                event.status = OutboxEvent.STATUS_FAILED
+                event.processed_at = datetime.utcnow()
+                print(f"❌ Outbox event {event_id} ({event.event_type}) failed permanently: {e}")
+            db.session.commit()
+
+    def _run(self):
+        """Background worker: drain pending events, then wait for a wakeup or the poll interval."""
+        while True:
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    while self.dispatch_pending():
+                        pass
+            except Exception as e:
+                print(f"❌ Outbox worker error: {e}")
+            self._wakeup.wait(self.poll_interval)
+
+
+# Singleton instance
+outbox = Outbox()
+
+
+# ============================================================================
+# Handlers
+# ============================================================================
+
+def _increment_profile(user_id, **deltas):
+    """SQL-side increments on a risk profile (no lost updates between dispatchers)."""
+    values = {getattr(UserRiskProfile, name): getattr(UserRiskProfile, name) + delta for name, delta in deltas.items()}
+    db.session.execute(
+        update(UserRiskProfile)
+        .where(UserRiskProfile.user_id == user_id)
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@outbox.handler('transaction.blocked')
+def create_fraud_alert(payload):
+    """
+    Alert admins about a blocked transaction and count it against the receiver.
+    The fraud_alert push carries the flushed alert row, so admin dashboards
+    prepend it instead of reloading a list that may not include it yet.
+    """
+    from app import socketio
+    from app.sockets import ADMINS_ROOM
+
+    risk_factors = payload.get('risk_factors') or []
+    alert = FraudAlert(
+        transaction_id=payload['transaction_id'],
+        alert_type='fraud_detected',
+        severity=AlertSeverity.HIGH if payload['fraud_probability'] > 0.7 else AlertSeverity.MEDIUM,
+        description=f"Transaction blocked: {', '.join(risk_factors[:3])}",
+    )
+    db.session.add(alert)
+    SystemCounters.increment(pending_alerts=1)
+
+    # Increment receiver's fraud flags
+    _increment_profile(payload['receiver_id'], fraud_flags=1, fraud_complaints_received=1)
+
+    db.session.flush()
+    socketio.emit('fraud_alert', {
+        'alert': alert.to_dict(),
+        'transaction_ref': payload['transaction_ref'],
+        'fraud_probability': payload['fraud_probability'],
+        'risk_factors': risk_factors,
+    }, to=ADMINS_ROOM)
+
+
+@outbox.handler('transaction.completed')
+def update_risk_profiles(payload):
+    """Roll a completed transaction into both parties' risk profile aggregates."""
+    _increment_profile(payload['sender_id'], total_transactions=1, successful_transactions=1)
+    db.session.execute(
+        update(UserRiskProfile)
+        .where(UserRiskProfile.user_id == payload['sender_id'])
+        .values(last_transaction_at=datetime.fromisoformat(payload['processed_at']))
+        .execution_options(synchronize_session=False)
+    )
+    _increment_profile(payload['receiver_id'], total_transactions=1, successful_transactions=1)
+
+
+@outbox.handler('transaction.notify')
+def emit_transaction_update(payload):
+    """Push the outcome over Socket.IO to the sender, receiver and admins only."""
+    from app import socketio
+    from app.sockets import transaction_rooms
+
+    socketio.emit('transaction_update', {
+        'transaction_ref': payload['transaction_ref'],
+        'status': payload['status'],
+        'is_fraud': payload['is_fraud'],
+    }, to=transaction_rooms(payload['sender_id'], payload['receiver_id']))
+
+
+@outbox.handler('transaction.dashboard')
+def push_dashboard_deltas(payload):
+    """
+    Build the dashboard deltas for a transaction once and push them to every
+    subscriber: the history row to each party (with its direction) and the
+    counter increments to admins, each with the per-minute activity bucket.
+    A separate event type from transaction.notify, so a retry of one doesn't
+    re-emit the other's events.
+    """
+    from app.sockets import activity_bucket, emit_stats_delta, user_room
+    from app import socketio
+
+    transaction = db.session.get(Transaction, payload['transaction_id'])
+    if transaction is None:
+        return
+
+    row = transaction.to_dict()
+    activity = activity_bucket(transaction.created_at, row['status'])
+
+    socketio.emit('transaction_created', {'transaction': {**row, 'direction': 'sent'}, 'activity': activity},
+                  to=user_room(payload['sender_id']))
+    if payload['receiver_id'] != payload['sender_id']:
+        socketio.emit('transaction_created', {'transaction': {**row, 'direction': 'received'}, 'activity': activity},
+                      to=user_room(payload['receiver_id']))
+
+    blocked = 1 if payload['is_fraud'] else 0
+    emit_stats_delta(
+        {'total_transactions': 1, 'blocked_transactions': blocked, 'pending_alerts': blocked},
+        transaction=row,
+        activity=activity,
+    )
@@ -3,10 +3,11 @@ API Routes for SafePay AI Demo
 Includes fraud detection prediction and recipient lookup endpoints.
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from app.services import fraud_service
 from app.data_service import data_service
-from app.utils import success_response, error_response, validate_features
+from app.features import feature_pipeline
+from app.utils import success_response, error_response, validate_features, validate_feature_batch
 import numpy as np
 
 main = Blueprint('main', __name__)
@@ -21,6 +22,24 @@ def home():
     return success_response(None, "Welcome to SafePay AI API - Exhibition Demo")
 
 
+@main.route('/ready', methods=['GET'])
+def ready():
+    """
+    Readiness probe for the load balancer.
+    Returns 503 until startup warm-up (PRELOAD_ON_STARTUP) has finished.
+    """
+    from app import readiness, warmup_status
+    
+    if readiness.is_set():
+        return success_response(warmup_status, "Ready")
+    
+    return jsonify({
+        "status": "error",
+        "message": "Service warming up",
+        "data": warmup_status
+    }), 503
+
+
 # ============================================================================
 # Recipient Lookup Endpoints
 # ============================================================================
@@ -147,6 +166,100 @@ def predict():
         return error_response(str(e), 500)
 
 
+@main.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Batch prediction endpoint for backlog rescoring and reconciliation files.
+    All rows are scored with a single model call.
+
+    Request body (either form):
+    {
+        "features": [[...22 features...], [...], ...]
+    }
+    {
+        "transactions": [
+            {"sender_upi_id": "...", "receiver_upi_id": "...", "transaction_amount": 500, "transaction_hour": 14},
+            ...
+        ]
+    }
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return error_response("No input data provided")
+
+        max_rows = current_app.config['MAX_BATCH_SIZE']
+        transactions = data.get('transactions')
+
+        if transactions is not None:
+            if not isinstance(transactions, list) or not transactions:
+                return error_response("Invalid input: transactions must be a non-empty list")
+            if len(transactions) > max_rows:
+                return error_response(f"Invalid input: Batch too large: {len(transactions)} rows (max {max_rows})")
+
+            from datetime import datetime
+            default_hour = datetime.now().hour
+            raw_rows = []
+            for index, tx in enumerate(transactions):
+                if not isinstance(tx, dict):
+                    return error_response(f"Row {index}: transaction must be an object")
+
+                receiver_upi = tx.get('receiver_upi_id')
+                amount = tx.get('transaction_amount')
+                if not all([tx.get('sender_upi_id'), receiver_upi, amount]):
+                    return error_response(f"Row {index}: missing required fields: sender_upi_id, receiver_upi_id, transaction_amount")
+                try:
+                    amount = float(amount)
+                except (ValueError, TypeError):
+                    return error_response(f"Row {index}: invalid transaction_amount: must be a number")
+
+                receiver = data_service.get_user_by_upi(receiver_upi)
+                if not receiver:
+                    return error_response(f"Row {index}: receiver '{receiver_upi}' not found in database", 404)
+
+                hour = tx.get('transaction_hour', default_hour)
+                raw_rows.append(transaction_raw_features(receiver, amount, hour))
+
+            # Normalize the whole batch at once
+            rows = feature_pipeline.build_records(raw_rows)
+        else:
+            rows = data.get('features')
+            is_valid, error_msg = validate_feature_batch(rows, max_rows)
+            if not is_valid:
+                return error_response(f"Invalid input: {error_msg}")
+
+        result = fraud_service.predict_batch(rows)
+
+        results = []
+        for label, probability in zip(result["prediction"], result["probability"]):
+            fraud_prob = probability[1]
+            results.append({
+                "prediction": label,
+                "is_fraud": label == 1,
+                "fraud_probability": fraud_prob,
+                "risk_score": round(fraud_prob * 100, 2),
+                "risk_level": get_risk_level(fraud_prob),
+            })
+
+        return success_response({
+            "results": results,
+            "count": len(results),
+            "fraud_count": sum(1 for r in results if r["is_fraud"]),
+        }, "Batch prediction successful")
+
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@main.route('/predict/stats', methods=['GET'])
+def predict_stats():
+    """
+    Model serving statistics.
+    Reports coalescer queue depth and batch sizes when coalescing is enabled.
+    """
+    return success_response(fraud_service.stats(), "Prediction stats")
+
+
 @main.route('/predict/transaction', methods=['POST'])
 def predict_transaction():
     """
@@ -255,116 +368,41 @@ def get_risk_level(fraud_prob):
         return "LOW"
 
 
-def build_transaction_features(receiver, amount, hour):
+def transaction_raw_features(receiver, amount, hour):
     """
-    Build the 22 normalized features for the model.
+    Raw (unnormalized) model inputs for a transaction to `receiver`.
     Uses DataService to fetch real historical stats from CSV/DB to ensure consistency.
     """
     
-    # Normalization ranges from training data
-    NORM_RANGES = {
-        'transaction_amount': (0.005817, 4747.858107),
-        'transaction_frequency': (0, 13),
-        'behavioral_biometrics': (0.00004, 3.0),
-        'time_since_last': (0.000168, 29.997497),
-        'social_trust_score': (0.012724, 99.987487),
-        'account_age': (0.000975, 4.999239),
-        'normalized_amount': (0.000421, 1.256827),
-        'context_anomalies': (0.000095, 3.997015),
-        'fraud_complaints': (0, 5),
-    }
-    
-    def normalize(value, min_val, max_val):
-        if max_val == min_val:
-            return 0.0
-        return max(0, min(1, (value - min_val) / (max_val - min_val)))
-    
-    # --- DYNAMIC FEATURE EXTRACTION ---
-    
     upi_id = receiver.get('upi_id')
-    
-    # 1. Frequency (Last 24h) from DataService
-    # This includes both CSV history and potentially DB history if DataService was fully unified,
-    # but currently DataService reads CSV. For the demo endpoint, CSV correctness is priority.
-    transaction_frequency = data_service.get_transaction_frequency(upi_id, hours=24)
-    
-    # 2. Time Since Last Transaction
-    time_since_last = data_service.get_time_since_last_transaction(upi_id)
-    
-    # 3. Profile Stats
-    risk_cat = receiver.get('risk_category', 'medium')
-    trust_score = float(receiver.get('social_trust_score', 50.0))
-    past_fraud_flags = int(receiver.get('past_fraud_flags', 0))
-    fraud_complaints = int(receiver.get('fraud_complaints_count', 0))
     geo_flag = receiver.get('geo_location_flag', 'normal')
     
-    # 4. Synthesized/Session Features
+    # Synthesized/Session Features
     # (Same logic as api_routes.py for consistency)
     import random
-    device_fingerprint = 0 
-    vpn_usage = 0 
-    behavioral_biometrics = random.uniform(0.1, 1.0)
-    location_inconsistent = 1 if geo_flag == 'unusual' else 0
-    context_anomalies = random.uniform(0, 1.0)
-    
-    # Normalize features
-    norm_amount = normalize(amount, *NORM_RANGES['transaction_amount'])
-    norm_frequency = normalize(transaction_frequency, *NORM_RANGES['transaction_frequency'])
-    norm_blacklist = receiver.get('blacklist_status', 0)
-    norm_device = device_fingerprint
-    norm_vpn = vpn_usage
-    norm_biometrics = normalize(behavioral_biometrics, *NORM_RANGES['behavioral_biometrics'])
-    norm_time = normalize(time_since_last, *NORM_RANGES['time_since_last'])
-    norm_trust = normalize(trust_score, *NORM_RANGES['social_trust_score'])
-    
-    account_age_years = receiver.get('account_age_months', 12) / 12.0
-    norm_age = normalize(account_age_years, *NORM_RANGES['account_age'])
-    
-    norm_high_risk_time = 1 if (hour >= 23 or hour <= 5) else 0
-    norm_past_fraud = 1 if past_fraud_flags > 0 else 0
-    norm_location = location_inconsistent
-    
-    raw_norm_amount = min(amount / 5000, 1.26)
-    norm_norm_amount = normalize(raw_norm_amount, *NORM_RANGES['normalized_amount'])
-    
-    norm_context = normalize(context_anomalies, *NORM_RANGES['context_anomalies'])
-    norm_complaints = normalize(fraud_complaints, *NORM_RANGES['fraud_complaints'])
-    norm_mismatch = receiver.get('merchant_category_mismatch', 0)
-    norm_limit = 1 if amount > 100000 else 0
-    norm_high_value = 1 if amount > 50000 else 0
     
-    # One-hot encoded categorical features
-    verification = receiver.get('verification_status', 'verified')
-    is_suspicious = 1 if verification == 'suspicious' or verification == 'suspended' else 0
-    is_verified = 1 if verification == 'verified' else 0
-    
-    is_geo_normal = 1 if geo_flag == 'normal' else 0
-    is_geo_unusual = 1 if geo_flag == 'unusual' else 0
-    
-    # Build feature array (22 features)
-    features = [
-        norm_amount,
-        norm_frequency,
-        norm_blacklist,
-        norm_device,
-        norm_vpn,
-        norm_biometrics,
-        norm_time,
-        norm_trust,
-        norm_age,
-        norm_high_risk_time,
-        norm_past_fraud,
-        norm_location,
-        norm_norm_amount,
-        norm_context,
-        norm_complaints,
-        norm_mismatch,
-        norm_limit,
-        norm_high_value,
-        is_suspicious,
-        is_verified,
-        is_geo_normal,
-        is_geo_unusual,
-    ]
-    
-    return features
+    return {
+        'amount': amount,
+        'hour': hour,
+        # Frequency (Last 24h) and recency from DataService (CSV history)
+        'frequency': data_service.get_transaction_frequency(upi_id, hours=24),
+        'time_since': data_service.get_time_since_last_transaction(upi_id),
+        'blacklist': receiver.get('blacklist_status', 0),
+        'device': 0,
+        'vpn': 0,
+        'biometrics': random.uniform(0.1, 1.0),
+        'trust': float(receiver.get('social_trust_score', 50.0)),
+        'age': receiver.get('account_age_months', 12) / 12.0,
+        'past_fraud': int(receiver.get('past_fraud_flags', 0)),
+        'location': 1 if geo_flag == 'unusual' else 0,
+        'context': random.uniform(0, 1.0),
+        'complaints': int(receiver.get('fraud_complaints_count', 0)),
+        'mismatch': receiver.get('merchant_category_mismatch', 0),
+        'verification_status': receiver.get('verification_status', 'verified'),
+        'geo_flag': geo_flag,
+    }
+
+
+def build_transaction_features(receiver, amount, hour):
+    """Build the 22 normalized features for the model."""
+    return feature_pipeline.build_row(transaction_raw_features(receiver, amount, hour))
@@ -0,0 +1,186 @@
+"""
+Recipient Search Index
+In-memory prefix and substring index over UPI IDs and display names,
+used for recipient autocomplete.
+"""
+
+import heapq
+from bisect import bisect_left
+
+# Fields returned for each search hit
+RESULT_FIELDS = ('upi_id', 'display_name', 'verification_status', 'risk_category')
+
+# Ranking tiers (lower is better)
+RANK_EXACT = 0
+RANK_UPI_PREFIX = 1
+RANK_NAME_PREFIX = 2
+RANK_WORD_PREFIX = 3
+
+# Sorts after every realistic key, bounding a prefix range from above
+PREFIX_SENTINEL = '\U0010ffff'
+
+# Posting lists up to this size are intersected exactly; longer ones are streamed
+INTERSECT_LIMIT = 4096
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _prefix_keys(upi_key, name_key):
+    """Keys a user can be prefix-matched on: UPI ID, full name and each later name word."""
+    keys = {upi_key, name_key}
+    keys.update(name_key.split()[1:])
+    keys.discard('')
+    return keys
+
+
+class UserSearchIndex:
+    """
+    Lowercased search index over users.
+
+    - A sorted list of (key, position) pairs over UPI IDs, names and name
+      words answers prefix queries with bisect; every hit in the prefix
+      range is ranked exact > UPI prefix > name prefix > name word prefix
+      and the best `limit` are kept.
+    - Remaining slots are filled with infix hits in insertion order. For
+      queries of 3+ characters the candidates come from a trigram inverted
+      index; shorter queries scan until `limit` hits are found.
+
+    Candidates are always verified against the current keys, so entries
+    left behind by updates are simply filtered out.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.upi_keys = []
+        self.name_keys = []
+        self.position_by_upi = {}
+        self._prefix_keys = []
+        self._prefix_positions = []
+        self._trigram_postings = {}
+
+    @classmethod
+    def from_records(cls, records):
+        index = cls()
+        for record in records:
+            index._append(record)
+
+        # Bulk build: sort once instead of inserting one key at a time
+        pairs = sorted(
+            (key, pos)
+            for pos, (upi_key, name_key) in enumerate(zip(index.upi_keys, index.name_keys))
+            for key in _prefix_keys(upi_key, name_key)
+        )
+        index._prefix_keys = [key for key, _ in pairs]
+        index._prefix_positions = [pos for _, pos in pairs]
+        return index
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record):
+        """Insert a user, or update it in place if the UPI ID is already indexed."""
+        upi_id = record.get('upi_id')
+        position = self.position_by_upi.get(upi_id)
+
+        if position is None:
+            position = self._append(record)
+            new_keys = _prefix_keys(self.upi_keys[position], self.name_keys[position])
+        else:
+            old_keys = _prefix_keys(self.upi_keys[position], self.name_keys[position])
+            self.records[position] = {field: record.get(field) for field in RESULT_FIELDS}
+            self.upi_keys[position] = (upi_id or '').lower()
+            self.name_keys[position] = (record.get('display_name') or '').lower()
+            self._index_trigrams(position)
+            new_keys = _prefix_keys(self.upi_keys[position], self.name_keys[position]) - old_keys
+
+        for key in new_keys:
+            insert_at = bisect_left(self._prefix_keys, key)
+            self._prefix_keys.insert(insert_at, key)
+            self._prefix_positions.insert(insert_at, position)
+
+    def search(self, query, limit=10):
+        """Return up to `limit` ranked result records matching `query` anywhere."""
+        if not query or limit <= 0:
+            return []
+
+        query = query.lower()
+
+        ranked = (
+            (rank, pos)
+            for pos, rank in ((pos, self._rank(pos, query)) for pos in self._prefix_candidates(query))
+            if rank is not None
+        )
+        results = [pos for _, pos in heapq.nsmallest(limit, ranked)]
+        seen = set(results)
+
+        for pos in self._infix_candidates(query):
+            if len(results) >= limit:
+                break
+            if pos not in seen and (query in self.upi_keys[pos] or query in self.name_keys[pos]):
+                seen.add(pos)
+                results.append(pos)
+
+        return [self.records[pos] for pos in results]
+
+    def _append(self, record):
+        position = len(self.records)
+        upi_id = record.get('upi_id')
+        self.records.append({field: record.get(field) for field in RESULT_FIELDS})
+        self.upi_keys.append((upi_id or '').lower())
+        self.name_keys.append((record.get('display_name') or '').lower())
+        self.position_by_upi.setdefault(upi_id, position)
+        self._index_trigrams(position)
+        return position
+
+    def _index_trigrams(self, position):
+        for gram in _trigrams(self.upi_keys[position]) | _trigrams(self.name_keys[position]):
+            postings = self._trigram_postings.setdefault(gram, [])
+            if not postings or postings[-1] != position:
+                postings.append(position)
+
+    def _prefix_candidates(self, query):
+        """Positions with any key starting with `query` (the whole key range, so none are missed)."""
+        start = bisect_left(self._prefix_keys, query)
+        end = bisect_left(self._prefix_keys, query + PREFIX_SENTINEL, lo=start)
+        return set(self._prefix_positions[start:end])
+
+    def _infix_candidates(self, query):
+        """Positions that may contain `query`, roughly in insertion order."""
+        if len(query) < 3:
+            return range(len(self.records))
+
+        postings = []
+        for gram in _trigrams(query):
+            positions = self._trigram_postings.get(gram)
+            if not positions:
+                return []
+            postings.append(positions)
+
+        postings.sort(key=len)
+        if len(postings[0]) > INTERSECT_LIMIT:
+            # Common trigrams: matches are dense, stream and stop early
+            return postings[0]
+
+        candidates = set(postings[0])
+        for positions in postings[1:]:
+            candidates.intersection_update(positions)
+            if not candidates:
+                break
+        return sorted(candidates)
+
+    def _rank(self, position, query):
+        """Ranking tier of a prefix candidate against the current keys, or None if it no longer matches."""
+        upi_key = self.upi_keys[position]
+        name_key = self.name_keys[position]
+
+        if query == upi_key or query == name_key:
+            return RANK_EXACT
+        if upi_key.startswith(query):
+            return RANK_UPI_PREFIX
+        if name_key.startswith(query):
+            return RANK_NAME_PREFIX
+        if any(word.startswith(query) for word in name_key.split()[1:]):
+            return RANK_WORD_PREFIX
+        return None
@@ -1,31 +1,178 @@
 import pickle
+import queue
+import threading
+import time
 import numpy as np
 from flask import current_app
 
+
+class _PendingPrediction:
+    """A single row waiting in the coalescer queue."""
+    __slots__ = ('features', 'done', 'prediction', 'probability', 'error')
+
+    def __init__(self, features):
+        self.features = features
+        self.done = threading.Event()
+        self.prediction = None
+        self.probability = None
+        self.error = None
+
+
+class PredictionCoalescer:
+    """
+    Micro-batching layer in front of the model.
+    Rows submitted by concurrent requests within `window_ms` (or until
+    `max_batch` rows are queued) are scored together as one matrix, and
+    each waiter receives its own row of the result.
+    """
+
+    def __init__(self, score_fn, window_ms=2.0, max_batch=64):
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._max_batch_seen = 0
+        self._last_batch_size = 0
+
+    def submit(self, features):
+        """Queue one feature row and block until its batch has been scored."""
+        self._ensure_worker()
+        pending = _PendingPrediction(features)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.prediction, pending.probability
+
+    def stats(self):
+        """Queue depth and batch-size statistics."""
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'rows': self._rows,
+                'avg_batch_size': round(self._rows / self._batches, 2) if self._batches else 0,
+                'max_batch_size': self._max_batch_seen,
+                'last_batch_size': self._last_batch_size,
+                'window_ms': self.window * 1000.0,
+                'max_batch': self.max_batch,
+            }
+
+    def _ensure_worker(self):
+        # Started lazily so pre-fork servers don't inherit a dead thread
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='prediction-coalescer', daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                features_matrix = np.ascontiguousarray([p.features for p in batch], dtype=np.float32)
+                prediction, probability = self.score_fn(features_matrix)
+                for i, pending in enumerate(batch):
+                    pending.prediction = prediction[i:i + 1]
+                    pending.probability = probability[i:i + 1]
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            finally:
+                with self._stats_lock:
+                    self._batches += 1
+                    self._rows += len(batch)
+                    self._last_batch_size = len(batch)
+                    self._max_batch_seen = max(self._max_batch_seen, len(batch))
+                for pending in batch:
+                    pending.done.set()
+
+
 class FraudDetectionService:
     def __init__(self):
         self.model = None
+        self.coalescer = None
+
+    def init_app(self, app):
+        """Configure optional serving features from the app config."""
+        if app.config.get('PREDICT_COALESCE_ENABLED'):
+            self.coalescer = PredictionCoalescer(
+                self._score,
+                window_ms=app.config['PREDICT_COALESCE_WINDOW_MS'],
+                max_batch=app.config['PREDICT_COALESCE_MAX_BATCH'],
+            )
+        else:
+            self.coalescer = None
 
     def load_model(self):
         if self.model is None:
             try:
-                model_path = current_app.config['MODEL_PATH']
-                with open(model_path, "rb") as file:
-                    self.model = pickle.load(file)
-                print(f"Model loaded from {model_path}")
+                engine = current_app.config.get('MODEL_ENGINE', 'sklearn')
+                
+                if engine == 'mmap':
+                    # Shared read-only pages, no pickle and no sklearn import
+                    from app.forest import CompiledForest
+                    model_path = current_app.config['MODEL_ARTIFACT_PATH']
+                    model = CompiledForest.load(model_path, mmap=True)
+                elif engine in ('sklearn', 'compiled'):
+                    model_path = current_app.config['MODEL_PATH']
+                    with open(model_path, "rb") as file:
+                        model = pickle.load(file)
+                    
+                    if engine == 'compiled':
+                        # Flatten the forest into packed arrays; sklearn is not used for scoring
+                        from app.forest import CompiledForest
+                        model = CompiledForest.from_estimator(model)
+                else:
+                    raise ValueError(f"Unknown MODEL_ENGINE '{engine}' (expected 'sklearn', 'compiled' or 'mmap')")
+                
+                self.model = model
+                print(f"Model loaded from {model_path} (engine: {engine})")
             except Exception as e:
                 print(f"Error loading model: {e}")
                 raise e
 
+    def _score(self, features_matrix):
+        """
+        Score a contiguous float32 feature matrix with a single forest pass.
+        Labels are derived from the probabilities (same rule as sklearn's
+        RandomForestClassifier.predict) so the trees are only walked once.
+        """
+        probability = self.model.predict_proba(features_matrix)
+        prediction = self.model.classes_.take(np.argmax(probability, axis=1))
+        return prediction, probability
+
     def predict(self, features):
         if self.model is None:
             self.load_model()
         
         try:
             # Reshape features for prediction
-            features_array = np.array(features).reshape(1, -1)
-            prediction = self.model.predict(features_array)
-            probability = self.model.predict_proba(features_array)
+            features_array = np.asarray(features, dtype=np.float32).reshape(1, -1)
+            if self.coalescer is not None:
+                prediction, probability = self.coalescer.submit(features_array[0])
+            else:
+                prediction, probability = self._score(features_array)
             return {
                 "prediction": prediction.tolist(),
                 "probability": probability.tolist()
@@ -34,5 +181,38 @@ class FraudDetectionService:
             print(f"Prediction error: {e}")
             raise e
 
+    def predict_batch(self, rows):
+        """
+        Score N feature vectors with one predict_proba call.
+        Returns the same structure as predict(), with one entry per row.
+        """
+        if self.model is None:
+            self.load_model()
+        
+        try:
+            features_matrix = np.ascontiguousarray(rows, dtype=np.float32)
+            if features_matrix.ndim != 2:
+                raise ValueError(f"Expected a 2-D feature matrix, got {features_matrix.ndim} dimension(s)")
+            if features_matrix.shape[0] == 0:
+                return {"prediction": [], "probability": []}
+            
+            prediction, probability = self._score(features_matrix)
+            return {
+                "prediction": prediction.tolist(),
+                "probability": probability.tolist()
+            }
+        except Exception as e:
+            print(f"Batch prediction error: {e}")
+            raise e
+
+    def stats(self):
+        """Serving statistics for the model (coalescer queue and batch sizes)."""
+        return {
+            'model_loaded': self.model is not None,
+            'engine': type(self.model).__name__ if self.model is not None else None,
+            'coalescing': self.coalescer is not None,
+            'coalescer': self.coalescer.stats() if self.coalescer is not None else None,
+        }
+
 # Singleton instance
 fraud_service = FraudDetectionService()
@@ -0,0 +1,72 @@
+"""
+Socket.IO Connection Handling
+Clients authenticate when they connect and are placed in per-user rooms
+(plus the admins room), so events go only to the parties involved.
+
+Dashboard channels (pushed instead of polled):
+  transaction_created -> user rooms: the new history row and its activity bucket
+  stats_delta         -> admins room: SystemCounters increments (and the row)
+  fraud_alert         -> admins room: the new FraudAlert row for a blocked payment
+"""
+
+from flask import request
+from flask_socketio import join_room, ConnectionRefusedError
+
+from app import socketio
+from app.auth_middleware import resolve_user_from_token
+
+ADMINS_ROOM = 'admins'
+
+
+def user_room(user_id):
+    """Room joined by every connection of a user."""
+    return f'user:{user_id}'
+
+
+def transaction_rooms(sender_id, receiver_id):
+    """Rooms that should see a transaction: both parties and the admins."""
+    return [user_room(sender_id), user_room(receiver_id), ADMINS_ROOM]
+
+
+def activity_bucket(when, status):
+    """Per-minute activity increment for a transaction, as plotted by the dashboards."""
+    return {
+        'minute': when.replace(second=0, microsecond=0).isoformat() if when else None,
+        'safe': 1 if status == 'completed' else 0,
+        'blocked': 1 if status == 'blocked' else 0,
+    }
+
+
+def emit_stats_delta(deltas, **extra):
+    """Push counter increments to admin dashboards (call after the change is committed)."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if deltas:
+        socketio.emit('stats_delta', {'deltas': deltas, **extra}, to=ADMINS_ROOM)
+
+
+def _connect_token(auth):
+    """Token from the Socket.IO auth payload, an Authorization header, or ?token=."""
+    if isinstance(auth, dict) and auth.get('token'):
+        return auth['token']
+
+    parts = request.headers.get('Authorization', '').split()
+    if len(parts) == 2 and parts[0].lower() == 'bearer':
+        return parts[1]
+
+    return request.args.get('token')
+
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    """Authenticate the connection and join the user's rooms; refuse anonymous clients."""
+    token = _connect_token(auth)
+    if not token:
+        raise ConnectionRefusedError('Authentication required')
+
+    user, _, error = resolve_user_from_token(token)
+    if error:
+        raise ConnectionRefusedError(error[0])
+
+    join_room(user_room(user.id))
+    if user.is_admin:
+        join_room(ADMINS_ROOM)
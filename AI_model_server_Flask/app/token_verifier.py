@@ -0,0 +1,196 @@
+"""
+Local Firebase ID Token Verification
+Verifies RS256-signed Firebase ID tokens in-process against public keys held
+in memory, so the request path never touches the network. Keys come from a
+local file (FIREBASE_PUBLIC_KEYS_PATH) or are fetched once at startup from
+Google's certificate endpoint and refreshed in the background.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import urllib.request
+
+try:
+    import jwt
+    from jwt.algorithms import RSAAlgorithm
+    from cryptography.x509 import load_pem_x509_certificate
+except ImportError:  # Local verification is optional; firebase_admin is used without it
+    jwt = None
+
+# Google's x509 certificates for Firebase ID tokens ({kid: PEM certificate})
+FIREBASE_CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+FIREBASE_ISSUER_PREFIX = 'https://securetoken.google.com/'
+
+# Retry delay after a failed key refresh, and the minimum gap between fetches (seconds)
+REFRESH_RETRY_SECONDS = 60
+MIN_REFRESH_SECONDS = 30
+
+
+class TokenVerificationError(Exception):
+    """Raised when a token cannot be verified; the message says why."""
+
+
+def load_public_keys(data):
+    """
+    Parse signing keys into {kid: public key}.
+    Accepts Google's x509 format ({kid: PEM certificate}) or a JWKS document
+    ({"keys": [{"kid": ..., "kty": "RSA", "n": ..., "e": ...}]}).
+    """
+    if isinstance(data, (str, bytes)):
+        data = json.loads(data)
+
+    if 'keys' in data:
+        return {jwk['kid']: RSAAlgorithm.from_jwk(jwk) for jwk in data['keys'] if jwk.get('kty') == 'RSA'}
+
+    return {
+        kid: load_pem_x509_certificate(pem.encode()).public_key()
+        for kid, pem in data.items()
+    }
+
+
+def _max_age(cache_control):
+    match = re.search(r'max-age=(\d+)', cache_control or '')
+    return int(match.group(1)) if match else None
+
+
+class TokenVerifier:
+    """
+    In-process verifier for Firebase ID tokens.
+
+    verify() checks the RS256 signature against the in-memory keys by `kid`,
+    then exp/iat/auth_time (with AUTH_TOKEN_LEEWAY_SECONDS of clock skew),
+    aud == project ID, iss == securetoken issuer and a non-empty sub. Tokens
+    signed with an unknown kid are rejected and wake the key refresher.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.project_id = None
+        self.keys = {}
+        self.keys_path = None
+        self.keys_url = FIREBASE_CERTS_URL
+        self.refresh_interval = 3600
+        self.leeway = 5
+        self._lock = threading.Lock()
+        self._refresh_now = threading.Event()
+        self._refresher_started = False
+
+    def init_app(self, app):
+        """Select the verifier from AUTH_TOKEN_VERIFIER and load keys (never inside a request)."""
+        self.enabled = app.config.get('AUTH_TOKEN_VERIFIER', 'firebase') == 'local'
+        if not self.enabled:
+            return
+        if jwt is None:
+            raise RuntimeError("AUTH_TOKEN_VERIFIER=local requires PyJWT and cryptography")
+
+        self.project_id = app.config.get('FIREBASE_PROJECT_ID') or self._project_id_from_credentials()
+        if not self.project_id:
+            raise RuntimeError("AUTH_TOKEN_VERIFIER=local requires FIREBASE_PROJECT_ID")
+
+        self.keys_path = app.config.get('FIREBASE_PUBLIC_KEYS_PATH')
+        self.keys_url = app.config.get('FIREBASE_PUBLIC_KEYS_URL') or FIREBASE_CERTS_URL
+        self.refresh_interval = app.config.get('FIREBASE_KEYS_REFRESH_INTERVAL', 3600)
+        self.leeway = app.config.get('AUTH_TOKEN_LEEWAY_SECONDS', 5)
+
+        if self.keys_path:
+            self.load_file(self.keys_path)
+            print(f"🔑 Token verifier loaded {len(self.keys)} keys from {self.keys_path}")
+            return
+
+        try:
+            delay = self.fetch()
+            print(f"🔑 Token verifier fetched {len(self.keys)} keys")
+        except Exception as e:
+            delay = REFRESH_RETRY_SECONDS
+            print(f"⚠️ Token verifier key fetch failed: {e}")
+
+        if not self._refresher_started:
+            from app import socketio
+            self._refresher_started = True
+            socketio.start_background_task(self._refresh_loop, delay)
+
+    @staticmethod
+    def _project_id_from_credentials():
+        cred_path = os.environ.get('FIREBASE_CREDENTIALS_PATH')
+        if cred_path and os.path.exists(cred_path):
+            with open(cred_path) as file:
+                return json.load(file).get('project_id')
+        return None
+
+    def set_keys(self, keys):
+        with self._lock:
+            self.keys = dict(keys)
+
+    def load_file(self, path):
+        with open(path) as file:
+            self.set_keys(load_public_keys(json.load(file)))
+
+    def fetch(self):
+        """Download the current keys. Returns seconds until they should be refreshed."""
+        with urllib.request.urlopen(self.keys_url, timeout=10) as response:
+            keys = load_public_keys(response.read())
+            max_age = _max_age(response.headers.get('Cache-Control'))
+        if not keys:
+            raise ValueError("no signing keys in response")
+        self.set_keys(keys)
+        return min(max_age or self.refresh_interval, self.refresh_interval)
+
+    def verify(self, id_token):
+        """Verify a Firebase ID token and return its claims (with 'uid' set from 'sub')."""
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.InvalidTokenError as e:
+            raise TokenVerificationError(f"Malformed token: {e}")
+
+        if header.get('alg') != 'RS256':
+            raise TokenVerificationError(f"Unexpected signing algorithm: {header.get('alg')}")
+
+        key = self.keys.get(header.get('kid'))
+        if key is None:
+            self._refresh_now.set()
+            raise TokenVerificationError(f"Unknown signing key: {header.get('kid')}")
+
+        try:
+            claims = jwt.decode(
+                id_token,
+                key,
+                algorithms=['RS256'],
+                audience=self.project_id,
+                issuer=FIREBASE_ISSUER_PREFIX + self.project_id,
+                leeway=self.leeway,
+                options={'require': ['exp', 'iat', 'aud', 'iss', 'sub']},
+            )
+        except jwt.InvalidTokenError as e:
+            raise TokenVerificationError(str(e))
+
+        subject = claims.get('sub')
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise TokenVerificationError("Invalid subject claim")
+        if claims.get('auth_time', 0) > time.time() + self.leeway:
+            raise TokenVerificationError("Token auth_time is in the future")
+
+        claims['uid'] = subject
+        return claims
+
+    def _refresh_loop(self, delay):
+        """Background task: refetch keys when they expire or an unknown kid is seen."""
+        from app import socketio
+
+        while True:
+            self._refresh_now.wait(delay)
+            self._refresh_now.clear()
+            try:
+                delay = self.fetch()
+            except Exception as e:
+                print(f"⚠️ Token verifier key refresh failed: {e}")
+                delay = REFRESH_RETRY_SECONDS
+            # Tokens with unknown kids can't force more than one fetch per interval
+            socketio.sleep(MIN_REFRESH_SECONDS)
+            delay = max(delay - MIN_REFRESH_SECONDS, 0)
+
+
+# Singleton instance
+token_verifier = TokenVerifier()
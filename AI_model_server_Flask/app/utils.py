@@ -1,3 +1,7 @@
+import base64
+import binascii
+import json
+from datetime import datetime
 from flask import jsonify
 
 def success_response(data, message="Success", status_code=200):
@@ -19,3 +23,28 @@ def validate_features(features):
     if len(features) != 22:
         return False, f"Expected 22 features, got {len(features)}"
     return True, None
+
+def validate_feature_batch(rows, max_rows):
+    if not rows or not isinstance(rows, list):
+        return False, "Rows must be a non-empty list"
+    if len(rows) > max_rows:
+        return False, f"Batch too large: {len(rows)} rows (max {max_rows})"
+    for index, features in enumerate(rows):
+        is_valid, error_msg = validate_features(features)
+        if not is_valid:
+            return False, f"Row {index}: {error_msg}"
+    return True, None
+
+def encode_cursor(created_at, row_id):
+    """Opaque keyset cursor for the (created_at, id) position of the last row on a page."""
+    payload = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,71 @@
+"""
+Model Artifact Exporter
+Compiles the pickled Random Forest into the memory-mappable artifact
+format read by MODEL_ENGINE=mmap (see app/forest.py).
+
+Usage:
+    python export_model.py [output_dir]
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from app.config import Config
+from app.features import FEATURE_NAMES, NORM_RANGES
+from app.forest import CompiledForest
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def main():
+    model_path = os.path.abspath(Config.MODEL_PATH)
+    output_dir = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else Config.MODEL_ARTIFACT_PATH)
+
+    print("=" * 60)
+    print("📦 Exporting compiled model artifact")
+    print("=" * 60)
+
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    print(f"✅ Model loaded from {model_path}")
+
+    forest = CompiledForest.from_estimator(model)
+    if forest.n_features_in_ != len(FEATURE_NAMES):
+        raise SystemExit(f"❌ Model expects {forest.n_features_in_} features, feature list has {len(FEATURE_NAMES)}")
+
+    manifest = forest.save(
+        output_dir,
+        feature_names=FEATURE_NAMES,
+        norm_ranges={name: list(bounds) for name, bounds in NORM_RANGES.items()},
+        source_model={
+            'file': os.path.basename(model_path),
+            'sha256': file_sha256(model_path),
+            'estimator': type(model).__name__,
+        },
+        exported_at=datetime.utcnow().isoformat(),
+    )
+    print(f"🌲 {manifest['n_trees']} trees, {manifest['n_nodes']} nodes, max depth {manifest['max_depth']}")
+
+    # Sanity check: the mapped artifact must reproduce the estimator's probabilities
+    reloaded = CompiledForest.load(output_dir)
+    sample = np.random.default_rng(0).random((512, forest.n_features_in_), dtype=np.float32)
+    max_diff = np.abs(reloaded.predict_proba(sample) - model.predict_proba(sample)).max()
+    if max_diff > 1e-9:
+        raise SystemExit(f"❌ Exported artifact differs from the estimator (max diff {max_diff})")
+
+    print(f"💾 Saved artifact to {output_dir} (max probability diff {max_diff:.2e})")
+
+
+if __name__ == "__main__":
+    main()
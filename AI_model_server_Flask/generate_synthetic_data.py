@@ -3,8 +3,32 @@ Synthetic UPI Transaction Data Generator (v2)
 Generates realistic UPI transaction data for exhibition demo.
 Uses the existing trained model to ensure label consistency.
 IMPORTANT: Features are normalized to match training data format.
+
+Usage:
+    python generate_synthetic_data.py [--mode vectorized|loop] [--transactions N]
+                                      [--users N] [--seed S] [--output-dir DIR]
+                                      [--chunk-size N [--format csv|parquet] [--resume]
+                                       [--workers N] [--merge]]
+                                      [--base-date ISO]
+
+--mode vectorized (default) draws every transaction as NumPy arrays, builds the
+feature matrix in one pass and labels it with one batched predict_proba;
+--mode loop is the original row-by-row generator.
+
+--chunk-size streams the transactions in fixed-size chunks to a partitioned
+dataset (upi_transactions/part-NNNNN.csv|parquet) with constant memory. A
+_progress.json manifest records the parameters and finished chunks, and
+--resume continues an interrupted run; each chunk has its own seed stream,
+so resumed output is identical to an uninterrupted run. --workers N
+generates chunks in a process pool (output does not depend on N), and
+--merge concatenates the partitions into one upi_transactions file.
 """
 
+import argparse
+import importlib.util
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
 import pickle
@@ -12,6 +36,8 @@ import random
 from datetime import datetime, timedelta
 import os
 
+from app.features import FEATURE_NAMES, feature_pipeline
+
 # Configuration
 NUM_USERS = 100
 NUM_TRANSACTIONS = 10000
@@ -20,35 +46,6 @@ OUTPUT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Load the trained model
 MODEL_PATH = os.path.join(OUTPUT_DIR, "best_rf_model (1).pkl")
 
-# Normalization ranges from original dataset (from the notebook output)
-# These are used to normalize raw values to 0-1 range
-NORM_RANGES = {
-    'transaction_amount': (0.005817, 4747.858107),  # min, max
-    'transaction_frequency': (0, 13),
-    'blacklist_status': (0, 1),
-    'device_fingerprinting': (0, 1),
-    'vpn_usage': (0, 1),
-    'behavioral_biometrics': (0.00004, 3.0),
-    'time_since_last': (0.000168, 29.997497),
-    'social_trust_score': (0.012724, 99.987487),
-    'account_age': (0.000975, 4.999239),
-    'high_risk_time': (0, 1),
-    'past_fraud_flags': (0, 1),
-    'location_inconsistent': (0, 1),
-    'normalized_amount': (0.000421, 1.256827),
-    'context_anomalies': (0.000095, 3.997015),
-    'fraud_complaints': (0, 5),
-    'merchant_mismatch': (0, 1),
-    'daily_limit_exceeded': (0, 1),
-    'recent_high_value': (0, 1),
-}
-
-def normalize(value, min_val, max_val):
-    """Normalize a value to 0-1 range using MinMaxScaler logic."""
-    if max_val == min_val:
-        return 0.0
-    return (value - min_val) / (max_val - min_val)
-
 def load_model():
     """Load the trained Random Forest model."""
     with open(MODEL_PATH, "rb") as f:
@@ -314,62 +311,11 @@ def generate_transaction_features_normalized(sender, receiver, amount, hour, use
     raw_limit = daily_limit_exceeded
     raw_high_value = recent_high_value
     
-    # Normalize numerical features
-    norm_amount = normalize(raw_amount, *NORM_RANGES['transaction_amount'])
-    norm_frequency = normalize(raw_frequency, *NORM_RANGES['transaction_frequency'])
-    norm_blacklist = raw_blacklist  # Already 0 or 1
-    norm_device = raw_device  # Already 0 or 1
-    norm_vpn = raw_vpn  # Already 0 or 1
-    norm_biometrics = normalize(raw_biometrics, *NORM_RANGES['behavioral_biometrics'])
-    norm_time = normalize(raw_time_since, *NORM_RANGES['time_since_last'])
-    norm_trust = normalize(raw_trust, *NORM_RANGES['social_trust_score'])
-    norm_age = normalize(raw_age, *NORM_RANGES['account_age'])
-    norm_high_risk_time = raw_high_risk_time  # Already 0 or 1
-    norm_past_fraud = raw_past_fraud  # Already 0 or 1
-    norm_location = raw_location  # Already 0 or 1
-    norm_norm_amount = normalize(raw_norm_amount, *NORM_RANGES['normalized_amount'])
-    norm_context = normalize(raw_context, *NORM_RANGES['context_anomalies'])
-    norm_complaints = normalize(raw_complaints, *NORM_RANGES['fraud_complaints'])
-    norm_mismatch = raw_mismatch  # Already 0 or 1
-    norm_limit = raw_limit  # Already 0 or 1
-    norm_high_value = raw_high_value  # Already 0 or 1
-    
-    # One-hot encoded categorical features (4 columns)
+    # One-hot encoded categorical features are derived from these by the pipeline
     # Verification Status: suspicious, verified (drop_first removes 'recently_registered')
     verification = receiver_info.get('verification_status', 'verified')
-    is_suspicious = 1 if verification == 'suspicious' else 0
-    is_verified = 1 if verification == 'verified' else 0
-    
     # Geo-Location: normal, unusual (drop_first removes 'high-risk')
     geo = receiver_info.get('geo_location_flag', 'normal')
-    is_geo_normal = 1 if geo == 'normal' else 0
-    is_geo_unusual = 1 if geo == 'unusual' else 0
-    
-    # Build the 22-feature array
-    features = [
-        norm_amount,           # 1. Transaction Amount
-        norm_frequency,        # 2. Transaction Frequency
-        norm_blacklist,        # 3. Recipient Blacklist Status
-        norm_device,           # 4. Device Fingerprinting
-        norm_vpn,              # 5. VPN or Proxy Usage
-        norm_biometrics,       # 6. Behavioral Biometrics
-        norm_time,             # 7. Time Since Last Transaction
-        norm_trust,            # 8. Social Trust Score
-        norm_age,              # 9. Account Age
-        norm_high_risk_time,   # 10. High-Risk Transaction Times
-        norm_past_fraud,       # 11. Past Fraudulent Behavior Flags
-        norm_location,         # 12. Location-Inconsistent Transactions
-        norm_norm_amount,      # 13. Normalized Transaction Amount
-        norm_context,          # 14. Transaction Context Anomalies
-        norm_complaints,       # 15. Fraud Complaints Count
-        norm_mismatch,         # 16. Merchant Category Mismatch
-        norm_limit,            # 17. User Daily Limit Exceeded
-        norm_high_value,       # 18. Recent High-Value Transaction Flags
-        is_suspicious,         # 19. Recipient Verification Status_suspicious
-        is_verified,           # 20. Recipient Verification Status_verified
-        is_geo_normal,         # 21. Geo-Location Flags_normal
-        is_geo_unusual,        # 22. Geo-Location Flags_unusual
-    ]
     
     # Store raw values for CSV output
     raw_features = {
@@ -395,14 +341,18 @@ def generate_transaction_features_normalized(sender, receiver, amount, hour, use
         'geo_flag': geo,
     }
     
+    # Build the 22-feature array with the server's feature pipeline.
+    # Training data was not clipped, so neither are the generated rows.
+    features = feature_pipeline.build_row(raw_features, clip=False)
+    
     return features, raw_features
 
-def generate_transactions(users_df, model, num_transactions):
+def generate_transactions(users_df, model, num_transactions, base_date=None):
     """Generate transaction records with model-predicted labels."""
     transactions = []
     user_ids = users_df['upi_id'].tolist()
     
-    base_date = datetime.now()
+    base_date = base_date or datetime.now()
     
     for i in range(num_transactions):
         # Select sender and receiver
@@ -484,28 +434,7 @@ def generate_transactions(users_df, model, num_transactions):
             'raw_fraud_complaints': raw_features['complaints'],
             'raw_past_fraud': raw_features['past_fraud'],
             # Normalized features (what the model sees)
-            'norm_f1_amount': features[0],
-            'norm_f2_frequency': features[1],
-            'norm_f3_blacklist': features[2],
-            'norm_f4_device': features[3],
-            'norm_f5_vpn': features[4],
-            'norm_f6_biometrics': features[5],
-            'norm_f7_time_since': features[6],
-            'norm_f8_trust': features[7],
-            'norm_f9_age': features[8],
-            'norm_f10_risk_time': features[9],
-            'norm_f11_past_fraud': features[10],
-            'norm_f12_location': features[11],
-            'norm_f13_norm_amount': features[12],
-            'norm_f14_context': features[13],
-            'norm_f15_complaints': features[14],
-            'norm_f16_mismatch': features[15],
-            'norm_f17_limit': features[16],
-            'norm_f18_high_value': features[17],
-            'norm_f19_suspicious': features[18],
-            'norm_f20_verified': features[19],
-            'norm_f21_geo_normal': features[20],
-            'norm_f22_geo_unusual': features[21],
+            **dict(zip(FEATURE_NAMES, features)),
             'fraud_probability': round(fraud_prob, 4),
             'label': int(prediction)
         }
@@ -517,38 +446,399 @@ def generate_transactions(users_df, model, num_transactions):
     
     return pd.DataFrame(transactions)
 
-def main():
-    print("=" * 60)
-    print("🚀 UPI Transaction Data Generator (v2 - Normalized)")
-    print("=" * 60)
+# Amount buckets (low, high) per receiver risk category; each bucket is equally likely
+AMOUNT_BUCKETS = {
+    'high': [(50, 500), (500, 5000), (5000, 50000), (50000, 200000)],
+    'medium': [(100, 1000), (1000, 10000), (10000, 50000)],
+    'safe': [(50, 500), (500, 2000), (2000, 5000)],
+}
+
+
+def draw_amounts(rng, risk_categories):
+    """Transaction amounts for an array of receiver risk categories."""
+    amounts = np.empty(len(risk_categories))
+    for category, buckets in AMOUNT_BUCKETS.items():
+        # Unknown categories are treated like 'safe', as in the row-by-row generator
+        mask = risk_categories == category if category != 'safe' else ~np.isin(risk_categories, ['high', 'medium'])
+        count = int(mask.sum())
+        bounds = np.asarray(buckets, dtype=np.float64)[rng.integers(0, len(buckets), count)]
+        amounts[mask] = rng.uniform(bounds[:, 0], bounds[:, 1])
+    return np.round(amounts, 2)
+
+
+def draw_hours(rng, high_risk):
+    """Transaction hours; high-risk receivers are biased towards late night."""
+    n = len(high_risk)
+    late_night = np.stack([rng.integers(0, 6, n), rng.integers(22, 24, n), rng.integers(0, 24, n)])
+    high_risk_hours = late_night[rng.integers(0, 3, n), np.arange(n)]
+    return np.where(high_risk, high_risk_hours, rng.integers(6, 23, n))
+
+
+def generate_transactions_vectorized(users_df, model, num_transactions, rng, base_date=None, start_index=0):
+    """
+    Vectorized equivalent of generate_transactions: same columns and
+    distributions, drawn as NumPy arrays from `rng` (a numpy Generator).
+    Transaction IDs are numbered from start_index + 1.
+    """
+    n = num_transactions
+    base_date = base_date or datetime.now()
+    user_ids = users_df['upi_id'].to_numpy()
+    num_users = len(user_ids)
     
-    # Load model
-    model = load_model()
+    # Sender and a different receiver, both uniform over users
+    sender = rng.integers(0, num_users, n)
+    receiver = rng.integers(0, num_users - 1, n)
+    receiver += receiver >= sender
+    
+    receivers = users_df.iloc[receiver]
+    risk_cat = receivers['risk_category'].to_numpy()
+    high_risk = risk_cat == 'high'
+    
+    amount = draw_amounts(rng, risk_cat)
+    
+    # Timestamps: up to 90 days back, late-night bias for high-risk receivers
+    days_ago = rng.integers(0, 91, n)
+    hour = draw_hours(rng, high_risk)
+    minute = rng.integers(0, 60, n)
+    offsets = (days_ago * 1440 + hour * 60 + minute).astype('timedelta64[m]')
+    timestamps = np.datetime64(base_date, 'us') - offsets
+    
+    # Behavioral noise: every high-risk receiver gets the risky pattern
+    # (the row generator's force_fraud only ever applies to high-risk receivers too)
+    frequency = np.where(high_risk, rng.integers(0, 3, n), rng.integers(2, 11, n))
+    device = np.where(high_risk, rng.random(n) < 1 / 3, 0).astype(np.int8)
+    vpn = np.where(high_risk, rng.random(n) < 0.5, rng.random(n) < 0.1).astype(np.int8)
+    biometrics = np.where(high_risk, rng.uniform(0.5, 3.0, n), rng.uniform(0, 1.5, n))
+    time_since = np.where(high_risk, rng.uniform(0, 5, n), rng.uniform(5, 30, n))
+    location = np.where(high_risk, rng.random(n) < 1 / 3, 0).astype(np.int8)
+    context = np.where(high_risk, rng.uniform(1.0, 4.0, n), rng.uniform(0, 1.5, n))
+    
+    raw_features = {
+        'amount': amount,
+        'hour': hour,
+        'frequency': frequency,
+        'blacklist': receivers['blacklist_status'].to_numpy(),
+        'device': device,
+        'vpn': vpn,
+        'biometrics': biometrics,
+        'time_since': time_since,
+        'trust': receivers['social_trust_score'].to_numpy(dtype=np.float64),
+        'age': receivers['account_age_months'].to_numpy() / 12,  # Convert to years
+        'past_fraud': receivers['past_fraud_flags'].to_numpy(),
+        'location': location,
+        'context': context,
+        'complaints': receivers['fraud_complaints_count'].to_numpy(),
+        'mismatch': receivers['merchant_category_mismatch'].to_numpy(),
+        'limit': (high_risk & (amount > 50000)).astype(np.int8),
+        'high_value': (high_risk & (amount > 10000)).astype(np.int8),
+        'verification_status': receivers['verification_status'].to_numpy(),
+        'geo_flag': receivers['geo_location_flag'].to_numpy(),
+    }
+    
+    # Whole feature matrix in one pass, labelled with one model call
+    features = feature_pipeline.build(raw_features, clip=False)
+    probability = model.predict_proba(features)
+    fraud_prob = probability[:, 1] if probability.shape[1] > 1 else probability[:, 0]
+    prediction = np.asarray(model.classes_).take(np.argmax(probability, axis=1))
+    
+    ids = pd.Series(np.arange(start_index + 1, start_index + n + 1)).astype(str).str.zfill(6)
+    
+    return pd.DataFrame({
+        'transaction_id': 'TXN' + ids,
+        'sender_upi_id': user_ids[sender],
+        'receiver_upi_id': user_ids[receiver],
+        'amount': amount,
+        'timestamp': np.datetime_as_string(timestamps, unit='us'),
+        'hour': hour,
+        'receiver_risk_category': risk_cat,
+        # Raw feature values for display
+        'raw_amount': amount,
+        'raw_frequency': frequency,
+        'raw_verification': raw_features['verification_status'],
+        'raw_blacklist': raw_features['blacklist'],
+        'raw_geo': raw_features['geo_flag'],
+        'raw_trust_score': raw_features['trust'],
+        'raw_account_age_years': raw_features['age'],
+        'raw_fraud_complaints': raw_features['complaints'],
+        'raw_past_fraud': raw_features['past_fraud'],
+        # Normalized features (what the model sees)
+        **{name: features[:, column] for column, name in enumerate(FEATURE_NAMES)},
+        'fraud_probability': np.round(fraud_prob, 4),
+        'label': prediction.astype(int),
+    })
+
+
+# Partitioned output (--chunk-size)
+DATASET_DIR = "upi_transactions"
+PROGRESS_FILE = "_progress.json"  # leading underscore: skipped by Parquet/Arrow dataset readers
+
+
+def chunk_rng(seed, chunk_index):
+    """Independent, reproducible random stream for one chunk (SeedSequence child `chunk_index`)."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+
+
+def chunk_path(dataset_dir, chunk_index, fmt):
+    return os.path.join(dataset_dir, f"part-{chunk_index:05d}.{fmt}")
+
+
+def write_atomic(path, write):
+    """Call write(tmp_path) and move the result into place, so readers never see partial files."""
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_progress(progress_path, progress):
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(progress, f, indent=2)
+    write_atomic(progress_path, write)
+
+
+def load_progress(progress_path, expected):
+    """Load a run manifest, refusing to resume with different generation parameters."""
+    with open(progress_path) as f:
+        progress = json.load(f)
+    for key, value in expected.items():
+        if value is not None and progress.get(key) != value:
+            raise SystemExit(f"❌ Cannot resume: {key} is {progress.get(key)!r} in {progress_path}, got {value!r}")
+    return progress
+
+
+def write_chunk(users_df, model, progress, dataset_dir, chunk_index):
+    """Generate, score and write one chunk. Returns its row and fraud counts."""
+    total, chunk_size = progress['num_transactions'], progress['chunk_size']
+    start = chunk_index * chunk_size
+    rows = min(chunk_size, total - start)
+    chunk_df = generate_transactions_vectorized(
+        users_df, model, rows, chunk_rng(progress['seed'], chunk_index),
+        base_date=datetime.fromisoformat(progress['base_date']), start_index=start,
+    )
     
-    # Generate users
+    if progress['format'] == 'parquet':
+        write_atomic(chunk_path(dataset_dir, chunk_index, 'parquet'), lambda tmp: chunk_df.to_parquet(tmp, index=False))
+    else:
+        write_atomic(chunk_path(dataset_dir, chunk_index, 'csv'), lambda tmp: chunk_df.to_csv(tmp, index=False))
+    
+    return {'rows': rows, 'fraud': int(chunk_df['label'].sum())}
+
+
+# Per-process state for --workers (set by _init_worker)
+_worker_state = {}
+
+
+def _init_worker(users_df, progress, dataset_dir):
+    _worker_state.update(users_df=users_df, progress=progress, dataset_dir=dataset_dir, model=load_model())
+
+
+def _write_chunk_in_worker(chunk_index):
+    state = _worker_state
+    return chunk_index, write_chunk(state['users_df'], state['model'], state['progress'], state['dataset_dir'], chunk_index)
+
+
+def generate_dataset(users_df, model, progress_path, progress, workers=1):
+    """
+    Generate the missing chunks of a partitioned run.
+    With workers=1 chunks are generated one at a time in this process; with
+    more, a process pool generates them concurrently (each worker loads the
+    model once). Chunk contents depend only on the seed and chunk index, so
+    the output is identical for any worker count. The manifest is written
+    only here, after each chunk completes.
+    """
+    dataset_dir = os.path.dirname(progress_path)
+    total, chunk_size = progress['num_transactions'], progress['chunk_size']
+    num_chunks = -(-total // chunk_size)
+    pending = [index for index in range(num_chunks) if str(index) not in progress['chunks']]
+    
+    def record(chunk_index, stats):
+        progress['chunks'][str(chunk_index)] = stats
+        save_progress(progress_path, progress)
+        done = sum(chunk['rows'] for chunk in progress['chunks'].values())
+        print(f"Generated chunk {chunk_index + 1}/{num_chunks} ({done}/{total} transactions)...")
+    
+    if workers <= 1:
+        for chunk_index in pending:
+            record(chunk_index, write_chunk(users_df, model, progress, dataset_dir, chunk_index))
+        return progress
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(users_df, dict(progress, chunks={}), dataset_dir)) as pool:
+        for future in as_completed([pool.submit(_write_chunk_in_worker, index) for index in pending]):
+            record(*future.result())
+    return progress
+
+
+def merge_dataset(dataset_dir, num_chunks, fmt, output_path):
+    """Concatenate the partition files in chunk order into one file, one part in memory at a time."""
+    def write(tmp_path):
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            writer = None
+            try:
+                for chunk_index in range(num_chunks):
+                    table = pq.read_table(chunk_path(dataset_dir, chunk_index, 'parquet'))
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_path, table.schema)
+                    writer.write_table(table)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            with open(tmp_path, 'wb') as out:
+                for chunk_index in range(num_chunks):
+                    with open(chunk_path(dataset_dir, chunk_index, 'csv'), 'rb') as part:
+                        if chunk_index > 0:
+                            part.readline()  # header
+                        shutil.copyfileobj(part, out, 1 << 20)
+    write_atomic(output_path, write)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic UPI users and model-labelled transactions.")
+    parser.add_argument('--mode', choices=['vectorized', 'loop'], default='vectorized',
+                        help="vectorized: NumPy batch generation (default); loop: original row-by-row generator")
+    parser.add_argument('--transactions', type=int, default=NUM_TRANSACTIONS, help="number of transactions")
+    parser.add_argument('--users', type=int, default=NUM_USERS, help="number of random users (demo users are added)")
+    parser.add_argument('--seed', type=int, default=None, help="random seed for reproducible output")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help="directory for upi_users.csv and upi_transactions.csv")
+    parser.add_argument('--base-date', type=datetime.fromisoformat, default=None,
+                        help="timestamps are drawn up to 90 days before this ISO date (default: now)")
+    parser.add_argument('--chunk-size', type=int, default=0,
+                        help="stream transactions in chunks of this size to a partitioned dataset (vectorized mode)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=None,
+                        help="partition file format with --chunk-size (default: csv, or the resumed run's format)")
+    parser.add_argument('--resume', action='store_true', help="continue an interrupted --chunk-size run in --output-dir")
+    parser.add_argument('--workers', type=int, default=1, help="processes generating chunks in parallel (with --chunk-size)")
+    parser.add_argument('--merge', action='store_true',
+                        help="also concatenate the partitions into upi_transactions.csv|parquet (with --chunk-size)")
+    args = parser.parse_args(argv)
+    
+    if args.chunk_size < 0:
+        parser.error("--chunk-size must be positive")
+    if args.chunk_size and args.mode != 'vectorized':
+        parser.error("--chunk-size requires --mode vectorized")
+    if args.resume and not args.chunk_size:
+        parser.error("--resume requires --chunk-size")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if (args.workers > 1 or args.merge) and not args.chunk_size:
+        parser.error("--workers and --merge require --chunk-size")
+    if args.format == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        parser.error("--format parquet requires pyarrow")
+    return args
+
+
+def create_users(args):
+    """Generate the user profiles and save them to upi_users.csv."""
     print("\n📋 Generating user profiles...")
-    users_df = generate_users(NUM_USERS)
+    users_df = generate_users(args.users)
     print(f"✅ Generated {len(users_df)} users")
     print(f"   - Safe: {len(users_df[users_df['risk_category'] == 'safe'])}")
     print(f"   - Medium: {len(users_df[users_df['risk_category'] == 'medium'])}")
     print(f"   - High: {len(users_df[users_df['risk_category'] == 'high'])}")
     
-    # Save users
-    users_path = os.path.join(OUTPUT_DIR, "upi_users.csv")
+    os.makedirs(args.output_dir, exist_ok=True)
+    users_path = os.path.join(args.output_dir, "upi_users.csv")
     users_df.to_csv(users_path, index=False)
     print(f"💾 Saved users to {users_path}")
+    return users_df
+
+
+def print_statistics(total, fraud_count):
+    normal_count = total - fraud_count
+    print(f"\n📊 Transaction Statistics:")
+    print(f"   - Total: {total}")
+    print(f"   - Normal (0): {normal_count} ({100*normal_count/max(total, 1):.1f}%)")
+    print(f"   - Fraud (1): {fraud_count} ({100*fraud_count/max(total, 1):.1f}%)")
+
+
+def main_partitioned(args, model):
+    """--chunk-size: stream to upi_transactions/part-*.{csv,parquet}, resumable."""
+    dataset_dir = os.path.join(args.output_dir, DATASET_DIR)
+    progress_path = os.path.join(dataset_dir, PROGRESS_FILE)
+    
+    if args.resume and os.path.exists(progress_path):
+        progress = load_progress(progress_path, {
+            'num_transactions': args.transactions,
+            'chunk_size': args.chunk_size,
+            'format': args.format,
+            'seed': args.seed,
+            'base_date': args.base_date.isoformat() if args.base_date else None,
+        })
+        # round_trip parsing gives back the exact floats that were written
+        args.format = progress['format']
+        if args.format == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+            raise SystemExit("❌ Cannot resume: this run writes parquet, which requires pyarrow")
+        users_df = pd.read_csv(os.path.join(args.output_dir, "upi_users.csv"), float_precision='round_trip')
+        print(f"\n↩️  Resuming: {len(progress['chunks'])} chunks already written, {len(users_df)} users loaded")
+    else:
+        if os.path.exists(progress_path):
+            raise SystemExit(f"❌ {dataset_dir} already holds a run; pass --resume or choose another --output-dir")
+        args.format = args.format or 'csv'
+        users_df = create_users(args)
+        os.makedirs(dataset_dir, exist_ok=True)
+        progress = {
+            'format': args.format,
+            'num_transactions': args.transactions,
+            'chunk_size': args.chunk_size,
+            # Recorded so a resumed run draws the same streams
+            'seed': args.seed if args.seed is not None else np.random.SeedSequence().entropy,
+            'base_date': (args.base_date or datetime.now()).isoformat(),
+            'num_users': len(users_df),
+            'chunks': {},
+        }
+        save_progress(progress_path, progress)
+    
+    print(f"\n💳 Generating {args.transactions} transactions in chunks of {args.chunk_size} "
+          f"({args.format}, {args.workers} worker{'s' if args.workers > 1 else ''})...")
+    progress = generate_dataset(users_df, model, progress_path, progress, workers=args.workers)
+    
+    print_statistics(
+        sum(chunk['rows'] for chunk in progress['chunks'].values()),
+        sum(chunk['fraud'] for chunk in progress['chunks'].values()),
+    )
+    print(f"\n💾 Saved transactions to {dataset_dir}")
+    
+    if args.merge:
+        merged_path = os.path.join(args.output_dir, f"upi_transactions.{args.format}")
+        merge_dataset(dataset_dir, len(progress['chunks']), args.format, merged_path)
+        print(f"💾 Merged partitions into {merged_path}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    print("=" * 60)
+    print("🚀 UPI Transaction Data Generator (v2 - Normalized)")
+    print("=" * 60)
+    
+    if args.seed is not None:
+        random.seed(args.seed)
+    
+    # Load model
+    model = load_model()
+    
+    if args.chunk_size:
+        main_partitioned(args, model)
+        print("\n" + "=" * 60)
+        print("✅ Data generation complete!")
+        print("=" * 60)
+        return
+    
+    # Generate and save users
+    users_df = create_users(args)
     
     # Generate transactions
-    print(f"\n💳 Generating {NUM_TRANSACTIONS} transactions...")
-    transactions_df = generate_transactions(users_df, model, NUM_TRANSACTIONS)
+    print(f"\n💳 Generating {args.transactions} transactions ({args.mode})...")
+    if args.mode == 'vectorized':
+        rng = np.random.default_rng(args.seed)
+        transactions_df = generate_transactions_vectorized(users_df, model, args.transactions, rng, base_date=args.base_date)
+    else:
+        transactions_df = generate_transactions(users_df, model, args.transactions, base_date=args.base_date)
     
     # Statistics
-    fraud_count = transactions_df['label'].sum()
-    normal_count = len(transactions_df) - fraud_count
-    print(f"\n📊 Transaction Statistics:")
-    print(f"   - Total: {len(transactions_df)}")
-    print(f"   - Normal (0): {normal_count} ({100*normal_count/len(transactions_df):.1f}%)")
-    print(f"   - Fraud (1): {fraud_count} ({100*fraud_count/len(transactions_df):.1f}%)")
+    print_statistics(len(transactions_df), int(transactions_df['label'].sum()))
     
     # Show sample fraud cases
     fraud_samples = transactions_df[transactions_df['label'] == 1].head(5)
@@ -558,7 +848,7 @@ def main():
               f"(prob: {row['fraud_probability']:.2%})")
     
     # Save transactions
-    transactions_path = os.path.join(OUTPUT_DIR, "upi_transactions.csv")
+    transactions_path = os.path.join(args.output_dir, "upi_transactions.csv")
     transactions_df.to_csv(transactions_path, index=False)
     print(f"\n💾 Saved transactions to {transactions_path}")
     
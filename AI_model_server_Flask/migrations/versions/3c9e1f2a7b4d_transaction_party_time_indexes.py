@@ -0,0 +1,32 @@
+"""Composite (party, created_at) indexes on transactions
+
+Serves the sender-or-receiver history and velocity queries
+(Transaction.for_user) with one index range scan per party.
+
+Revision ID: 3c9e1f2a7b4d
+Revises: 
+Create Date: 2026-10-17 10:12:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e1f2a7b4d'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables predate migrations (db.create_all), and fresh databases already
+    # get these indexes from the model, hence if_not_exists
+    op.create_index('ix_transactions_sender_created', 'transactions',
+                    ['sender_id', 'created_at'], unique=False, if_not_exists=True)
+    op.create_index('ix_transactions_receiver_created', 'transactions',
+                    ['receiver_id', 'created_at'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_transactions_receiver_created', table_name='transactions', if_exists=True)
+    op.drop_index('ix_transactions_sender_created', table_name='transactions', if_exists=True)
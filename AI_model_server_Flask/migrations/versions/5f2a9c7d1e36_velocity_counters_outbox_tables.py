@@ -0,0 +1,71 @@
+"""Maintained velocity, stats counter and outbox tables
+
+user_velocity holds per-user hourly transaction counts for the fraud check,
+system_counters the sharded admin stats totals, and outbox_events the
+post-commit side effects of payments (status, id index for the dispatcher).
+
+Revision ID: 5f2a9c7d1e36
+Revises: 8d41b6e0c2f5
+Create Date: 2026-10-17 12:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2a9c7d1e36'
+down_revision = '8d41b6e0c2f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases started since these models were added already have the tables
+    # from db.create_all, hence if_not_exists
+    op.create_table(
+        'user_velocity',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('hourly_counts', sa.JSON(), nullable=True),
+        sa.Column('last_tx_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'system_counters',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('total_users', sa.Integer(), nullable=False),
+        sa.Column('suspended_users', sa.Integer(), nullable=False),
+        sa.Column('total_transactions', sa.Integer(), nullable=False),
+        sa.Column('blocked_transactions', sa.Integer(), nullable=False),
+        sa.Column('pending_alerts', sa.Integer(), nullable=False),
+        sa.Column('reconciled_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_outbox_events_status_id', 'outbox_events',
+                    ['status', 'id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_outbox_events_status_id', table_name='outbox_events', if_exists=True)
+    op.drop_table('outbox_events', if_exists=True)
+    op.drop_table('system_counters', if_exists=True)
+    op.drop_table('user_velocity', if_exists=True)
@@ -0,0 +1,26 @@
+"""Composite (reviewed, created_at) index on fraud_alerts
+
+Serves keyset pagination of the admin review queue.
+
+Revision ID: 8d41b6e0c2f5
+Revises: 3c9e1f2a7b4d
+Create Date: 2026-10-17 11:03:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41b6e0c2f5'
+down_revision = '3c9e1f2a7b4d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_fraud_alerts_reviewed_created', 'fraud_alerts',
+                    ['reviewed', 'created_at'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_fraud_alerts_reviewed_created', table_name='fraud_alerts', if_exists=True)
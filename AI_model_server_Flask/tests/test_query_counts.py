@@ -0,0 +1,109 @@
+"""
+Query-count regression tests for the paginated list endpoints.
+History and alert pages must cost a constant number of statements however
+many rows they return (no per-row lazy loads of sender, receiver or reviewer).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.config import Config
+from app.database import db
+from app.models import FraudAlert, Transaction, TransactionStatus, User
+
+AUTH = {'Authorization': 'Bearer demo-token'}
+
+
+class QueryCountConfig(Config):
+    TESTING = True
+    DATABASE_URL = 'sqlite://'
+    OUTBOX_WORKER_ENABLED = False
+    STATS_RECONCILE_INTERVAL = 0
+    PRELOAD_ON_STARTUP = False
+
+
+def seed(n):
+    """Give the demo user n transactions, each with its own counterparty and a reviewed alert."""
+    demo = User.query.filter_by(upi_id='demo.user@upi').one()
+    start = datetime.utcnow() - timedelta(hours=1)
+
+    for i in range(n):
+        counterparty = User(upi_id=f'party{i}@upi', display_name=f'Party {i}')
+        reviewer = User(upi_id=f'reviewer{i}@upi', display_name=f'Reviewer {i}', is_admin=True)
+        db.session.add_all([counterparty, reviewer])
+        db.session.flush()
+
+        sender, receiver = (demo, counterparty) if i % 2 else (counterparty, demo)
+        transaction = Transaction(
+            transaction_ref=f'TXNTEST{i:06d}',
+            sender_id=sender.id,
+            receiver_id=receiver.id,
+            amount=100 + i,
+            status=TransactionStatus.BLOCKED,
+            is_fraud=True,
+            fraud_score=0.9,
+            created_at=start + timedelta(seconds=i),
+        )
+        db.session.add(transaction)
+        db.session.flush()
+
+        db.session.add(FraudAlert(
+            transaction_id=transaction.id,
+            alert_type='high_risk_recipient',
+            reviewed=True,
+            reviewed_by=reviewer.id,
+            reviewed_at=start,
+            created_at=start + timedelta(seconds=i),
+        ))
+    db.session.commit()
+
+
+def count_queries(app, client, url):
+    """Number of SQL statements executed while serving GET url."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url, headers=AUTH)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert response.status_code == 200, response.get_json()
+    return len(statements), response.get_json()['data']
+
+
+def page_query_counts(n):
+    app = create_app(QueryCountConfig)
+    with app.app_context():
+        seed(n)
+
+    client = app.test_client()
+    urls = {
+        'history': '/api/transactions/history?per_page=50',
+        'alerts': '/api/admin/alerts?reviewed=true&per_page=50',
+    }
+    for url in urls.values():
+        client.get(url, headers=AUTH)  # warm the auth identity cache
+
+    counts = {}
+    for name, url in urls.items():
+        counts[name], data = count_queries(app, client, url)
+        rows = data['transactions'] if name == 'history' else data['alerts']
+        assert len(rows) == n
+    return counts
+
+
+@pytest.mark.parametrize('endpoint', ['history', 'alerts'])
+def test_list_endpoints_issue_constant_queries(endpoint):
+    small = page_query_counts(1)
+    large = page_query_counts(20)
+
+    assert small[endpoint] == large[endpoint]
@@ -0,0 +1,41 @@
+"""
+Tests for recipient search ranking (app.search_index).
+"""
+
+from app.search_index import UserSearchIndex
+
+
+def user(upi_id, display_name):
+    return {'upi_id': upi_id, 'display_name': display_name}
+
+
+def test_upi_prefix_outranks_name_words_that_sort_earlier():
+    # 'raa###' name words sort before 'rab@upi' and outnumber limit * 8
+    records = [user(f'amit{i}@upi', f'Amit Raa{i:03d}') for i in range(100)]
+    records.append(user('rab@upi', 'Someone Else'))
+    index = UserSearchIndex.from_records(records)
+
+    results = index.search('ra', limit=3)
+
+    assert results[0]['upi_id'] == 'rab@upi'
+    assert len(results) == 3
+
+
+def test_ranking_tiers():
+    index = UserSearchIndex.from_records([
+        user('zed@upi', 'Asha Rao'),
+        user('rao.k@upi', 'Kiran'),
+        user('x@upi', 'Raoul Dsouza'),
+        user('rao', 'Exact'),
+    ])
+
+    results = [record['upi_id'] for record in index.search('rao', limit=10)]
+
+    assert results == ['rao', 'rao.k@upi', 'x@upi', 'zed@upi']
+
+
+def test_added_users_are_ranked_with_bulk_loaded_ones():
+    index = UserSearchIndex.from_records([user(f'u{i}@upi', f'Amit Raa{i:03d}') for i in range(50)])
+    index.add(user('rab@upi', 'Late Joiner'))
+
+    assert index.search('ra', limit=1)[0]['upi_id'] == 'rab@upi'
@@ -0,0 +1,113 @@
+"""
+Tests for in-process Firebase ID token verification (app.token_verifier).
+Keys are generated locally and loaded both as Google's x509 certificate map
+and as a JWKS document.
+"""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from jwt.algorithms import RSAAlgorithm
+
+from app.token_verifier import (
+    FIREBASE_ISSUER_PREFIX,
+    TokenVerificationError,
+    TokenVerifier,
+    load_public_keys,
+)
+
+PROJECT_ID = 'safepay-test'
+KID = 'test-key'
+
+
+def generate_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def certificate_pem(private_key):
+    """Self-signed certificate for the key, as Google publishes them."""
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'securetoken.system.gserviceaccount.com')])
+    now = datetime.now(timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(private_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(private_key, hashes.SHA256())
+    )
+    return certificate.public_bytes(serialization.Encoding.PEM).decode()
+
+
+def jwks(private_key):
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update(kid=KID, alg='RS256', use='sig')
+    return {'keys': [jwk]}
+
+
+@pytest.fixture(scope='module')
+def private_key():
+    return generate_key()
+
+
+@pytest.fixture(params=['x509', 'jwks'])
+def verifier(request, private_key):
+    if request.param == 'x509':
+        data = json.dumps({KID: certificate_pem(private_key)})
+    else:
+        data = jwks(private_key)
+
+    verifier = TokenVerifier()
+    verifier.project_id = PROJECT_ID
+    verifier.set_keys(load_public_keys(data))
+    return verifier
+
+
+def make_token(private_key, kid=KID, **overrides):
+    now = int(time.time())
+    claims = {
+        'iss': FIREBASE_ISSUER_PREFIX + PROJECT_ID,
+        'aud': PROJECT_ID,
+        'sub': 'firebase-user-1',
+        'iat': now,
+        'exp': now + 3600,
+        'auth_time': now,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, private_key, algorithm='RS256', headers={'kid': kid})
+
+
+def test_valid_token_is_accepted(verifier, private_key):
+    claims = verifier.verify(make_token(private_key))
+
+    assert claims['uid'] == 'firebase-user-1'
+    assert claims['aud'] == PROJECT_ID
+
+
+@pytest.mark.parametrize('overrides', [
+    {'exp': int(time.time()) - 3600, 'iat': int(time.time()) - 7200},
+    {'aud': 'another-project'},
+    {'iss': FIREBASE_ISSUER_PREFIX + 'another-project'},
+], ids=['expired', 'wrong-aud', 'wrong-iss'])
+def test_invalid_claims_are_rejected(verifier, private_key, overrides):
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(make_token(private_key, **overrides))
+
+
+def test_unknown_kid_is_rejected(verifier, private_key):
+    with pytest.raises(TokenVerificationError, match='Unknown signing key'):
+        verifier.verify(make_token(private_key, kid='rotated-key'))
+
+
+def test_token_signed_by_another_key_is_rejected(verifier):
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(make_token(generate_key()))
@@ -20,10 +20,8 @@ export function AuthProvider({ children }) {
     // Initialize socket connection
     useEffect(() => {
         if (isAuthenticated()) {
+            // Per-user rooms are joined server-side from the connection's token
             socketService.connect();
-            if (userProfile?.id) {
-                socketService.joinRoom(userProfile.id);
-            }
         }
         return () => socketService.disconnect();
     }, [user, isDemoMode, userProfile?.id]);
@@ -25,7 +25,10 @@ class SocketService {
 
         console.log('🔌 Connecting to WebSocket:', SOCKET_URL);
 
+        // The server authenticates the connection and joins this user's rooms;
+        // the token is read on every (re)connect so a fresh login is picked up
         this.socket = io(SOCKET_URL, {
+            auth: (cb) => cb({ token: localStorage.getItem('authToken') }),
             transports: ['websocket', 'polling'],
             autoConnect: true,
             reconnection: true,
@@ -137,14 +140,6 @@ class SocketService {
         }
     }
 
-    /**
-     * Join a room (for user-specific events)
-     * @param {string} userId - User ID to join room for
-     */
-    joinRoom(userId) {
-        this.emit('join', { user_id: userId });
-    }
-
     /**
      * Check if connected
      */
@@ -1,8 +1,10 @@
 import { motion, Variants } from "framer-motion";
 import { TrendingUp, TrendingDown, Wallet, CreditCard, ShieldCheck } from "lucide-react";
 import { useAuth } from "@/context/AuthContext";
-import { useEffect, useState } from "react";
+import { useState } from "react";
 import { transactionAPI } from "@/lib/api";
+import { TransactionCreatedEvent } from "@/lib/socket";
+import { useLiveUpdates } from "@/hooks/use-live-updates";
 
 const containerVariants: Variants = {
   hidden: { opacity: 0 },
@@ -27,7 +29,7 @@ export function DashboardStats() {
   const { getBalance } = useAuth();
   const [balance, setBalance] = useState(0);
   const [todaySpent, setTodaySpent] = useState(0);
-  const [blockedUsersCount, setBlockedUsersCount] = useState(0);
+  const [blockedUsers, setBlockedUsers] = useState<Set<string>>(new Set());
   const [transactionCount, setTransactionCount] = useState(0);
   const [totalBlockedTxs, setTotalBlockedTxs] = useState(0);
 
@@ -58,10 +60,10 @@ export function DashboardStats() {
 
         // Calculate blocked users (all time) - unique UPI IDs that were blocked
         const blockedTxs = txs.filter((tx: any) => tx.status === 'blocked');
-        const uniqueBlockedUsers = new Set(
+        const uniqueBlockedUsers = new Set<string>(
           blockedTxs.map((tx: any) => tx.receiver_upi_id)
         );
-        setBlockedUsersCount(uniqueBlockedUsers.size);
+        setBlockedUsers(uniqueBlockedUsers);
         setTotalBlockedTxs(blockedTxs.length);
       }
     } catch (error) {
@@ -69,12 +71,22 @@ export function DashboardStats() {
     }
   };
 
-  useEffect(() => {
-    loadStats();
-    // Auto-refresh every 10 seconds
-    const interval = setInterval(loadStats, 10000);
-    return () => clearInterval(interval);
-  }, []);
+  // Apply pushed transactions the same way loadStats derives the totals
+  useLiveUpdates(loadStats, {
+    transaction_created: ({ transaction: tx }: TransactionCreatedEvent) => {
+      if (tx.status === 'completed') {
+        if (tx.direction === 'received') {
+          setBalance((prev) => prev + tx.amount);
+        } else if (new Date(tx.created_at).toDateString() === new Date().toDateString()) {
+          setTodaySpent((prev) => prev + tx.amount);
+          setTransactionCount((prev) => prev + 1);
+        }
+      } else if (tx.status === 'blocked') {
+        setBlockedUsers((prev) => new Set(prev).add(tx.receiver_upi_id));
+        setTotalBlockedTxs((prev) => prev + 1);
+      }
+    },
+  });
 
   const stats = [
     {
@@ -95,7 +107,7 @@ export function DashboardStats() {
     },
     {
       title: "Blocked Users",
-      value: `${blockedUsersCount}`,
+      value: `${blockedUsers.size}`,
       change: `${totalBlockedTxs} attempts`,
       trend: "up",
       icon: ShieldCheck,
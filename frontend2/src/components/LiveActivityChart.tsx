@@ -8,8 +8,10 @@ import {
   ResponsiveContainer,
   CartesianGrid,
 } from "recharts";
-import { useEffect, useState } from "react";
+import { useState } from "react";
 import { transactionAPI } from "@/lib/api";
+import { TransactionCreatedEvent } from "@/lib/socket";
+import { useLiveUpdates } from "@/hooks/use-live-updates";
 
 interface ChartData {
   time: string;
@@ -17,6 +19,12 @@ interface ChartData {
   blocked: number;
 }
 
+// Chart bucket (4-hour block) for a timestamp
+const blockKey = (dateStr: string) => {
+  const hour = Math.floor(new Date(dateStr).getHours() / 4) * 4;
+  return hour.toString().padStart(2, '0') + ':00';
+};
+
 export function LiveActivityChart() {
   const [chartData, setChartData] = useState<ChartData[]>([]);
   const [loading, setLoading] = useState(true);
@@ -38,9 +46,7 @@ export function LiveActivityChart() {
 
         // Count transactions per hour
         txs.forEach((tx: any) => {
-          const date = new Date(tx.created_at);
-          const hour = Math.floor(date.getHours() / 4) * 4; // Group by 4-hour blocks
-          const timeKey = hour.toString().padStart(2, '0') + ':00';
+          const timeKey = blockKey(tx.created_at); // Group by 4-hour blocks
 
           if (hourlyData[timeKey]) {
             if (tx.status === 'blocked') {
@@ -67,12 +73,20 @@ export function LiveActivityChart() {
     }
   };
 
-  useEffect(() => {
-    loadActivityData();
-    // Auto-refresh every 10 seconds
-    const interval = setInterval(loadActivityData, 10000);
-    return () => clearInterval(interval);
-  }, []);
+  // Per-minute activity buckets are pushed by the server and folded into the chart
+  useLiveUpdates(loadActivityData, {
+    transaction_created: ({ activity }: TransactionCreatedEvent) => {
+      if (!activity.minute) return;
+      const timeKey = blockKey(activity.minute);
+      setChartData((prev) =>
+        prev.map((point) =>
+          point.time === timeKey
+            ? { ...point, safe: point.safe + activity.safe, blocked: point.blocked + activity.blocked }
+            : point
+        )
+      );
+    },
+  });
 
   return (
     <motion.div
@@ -1,7 +1,9 @@
 import { motion } from "framer-motion";
 import { CheckCircle, XCircle, AlertTriangle } from "lucide-react";
-import { useEffect, useState } from "react";
+import { useState } from "react";
 import { transactionAPI } from "@/lib/api";
+import { TransactionCreatedEvent } from "@/lib/socket";
+import { useLiveUpdates } from "@/hooks/use-live-updates";
 
 const statusConfig = {
   completed: {
@@ -50,12 +52,15 @@ export function RecentTransactions() {
     }
   };
 
-  useEffect(() => {
-    loadTransactions();
-    // Auto-refresh every 10 seconds
-    const interval = setInterval(loadTransactions, 10000);
-    return () => clearInterval(interval);
-  }, []);
+  // New rows are pushed by the server; REST is only the initial load and fallback
+  useLiveUpdates(loadTransactions, {
+    transaction_created: ({ transaction }: TransactionCreatedEvent) => {
+      setTransactions((prev) => [
+        transaction,
+        ...prev.filter((tx) => tx.transaction_ref !== transaction.transaction_ref),
+      ].slice(0, 10));
+    },
+  });
 
   const formatTime = (dateStr: string) => {
     const date = new Date(dateStr);
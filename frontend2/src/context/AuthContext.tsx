@@ -6,6 +6,7 @@
 
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react';
 import { authAPI, userAPI } from '../lib/api';
+import { reconnectSocket } from '../lib/socket';
 
 interface User {
     uid: string;
@@ -78,6 +79,7 @@ export function AuthProvider({ children }: { children: ReactNode }) {
             if (!token) {
                 console.log('🔐 Auto-activating demo mode...');
                 localStorage.setItem('authToken', 'demo-token');
+                reconnectSocket();
                 setIsDemoMode(true);
                 setUser({ uid: 'demo', email: 'demo@example.com', displayName: 'Demo User' });
                 await loadUserProfile();
@@ -109,6 +111,7 @@ export function AuthProvider({ children }: { children: ReactNode }) {
     const signOut = async () => {
         try {
             localStorage.removeItem('authToken');
+            reconnectSocket();
             setUser(null);
             setUserProfile(null);
             setIsDemoMode(false);
@@ -121,6 +124,7 @@ export function AuthProvider({ children }: { children: ReactNode }) {
     const useDemoMode = async () => {
         console.log('🔐 Activating demo mode...');
         localStorage.setItem('authToken', 'demo-token');
+        reconnectSocket();
         setIsDemoMode(true);
         setUser({ uid: 'demo', email: 'demo@example.com', displayName: 'Demo User' });
         await loadUserProfile();
@@ -0,0 +1,39 @@
+import * as React from "react";
+import { FALLBACK_REFRESH_MS, getSocket, subscribe } from "@/lib/socket";
+
+/**
+ * Keep a component live from pushed Socket.IO events.
+ * `refresh` loads the full state once on mount and then only on the slow
+ * fallback interval (and on reconnect); `handlers` apply pushed deltas.
+ */
+export function useLiveUpdates(
+  refresh: () => void,
+  handlers: Record<string, (payload: any) => void>,
+) {
+  const refreshRef = React.useRef(refresh);
+  const handlersRef = React.useRef(handlers);
+  refreshRef.current = refresh;
+  handlersRef.current = handlers;
+
+  React.useEffect(() => {
+    refreshRef.current();
+    const interval = setInterval(() => refreshRef.current(), FALLBACK_REFRESH_MS);
+
+    const unsubscribers = Object.keys(handlersRef.current).map((event) =>
+      subscribe(event, (payload) => handlersRef.current[event]?.(payload)),
+    );
+    // Deltas pushed while disconnected are lost, so resync after reconnecting
+    let connectedBefore = getSocket().connected;
+    unsubscribers.push(
+      subscribe("connect", () => {
+        if (connectedBefore) refreshRef.current();
+        connectedBefore = true;
+      }),
+    );
+
+    return () => {
+      clearInterval(interval);
+      unsubscribers.forEach((unsubscribe) => unsubscribe());
+    };
+  }, []);
+}
@@ -113,10 +113,14 @@ export const transactionAPI = {
     },
 
     /**
-     * Get transaction history
+     * Get transaction history.
+     * Pass the previous response's next_cursor to continue; page > 1 uses
+     * the server's legacy offset pagination (with totals).
      */
-    getHistory: async (page: number = 1, perPage: number = 20, status: string | null = null) => {
-        const params = new URLSearchParams({ page: page.toString(), per_page: perPage.toString() });
+    getHistory: async (page: number = 1, perPage: number = 20, status: string | null = null, cursor: string | null = null) => {
+        const params = new URLSearchParams({ per_page: perPage.toString() });
+        if (cursor) params.append('cursor', cursor);
+        else if (page > 1) params.append('page', page.toString());
         if (status) params.append('status', status);
 
         const { data } = await api.get(`/api/transactions/history?${params}`);
@@ -152,10 +156,12 @@ export const demoAPI = {
 
 export const adminAPI = {
     /**
-     * Get fraud alerts
+     * Get fraud alerts (paginated like getHistory)
      */
-    getAlerts: async (page: number = 1, perPage: number = 20, includeReviewed: boolean = false) => {
-        const params = new URLSearchParams({ page: page.toString(), per_page: perPage.toString(), reviewed: includeReviewed.toString() });
+    getAlerts: async (page: number = 1, perPage: number = 20, includeReviewed: boolean = false, cursor: string | null = null) => {
+        const params = new URLSearchParams({ per_page: perPage.toString(), reviewed: includeReviewed.toString() });
+        if (cursor) params.append('cursor', cursor);
+        else if (page > 1) params.append('page', page.toString());
         const { data } = await api.get(`/api/admin/alerts?${params}`);
         return data;
     },
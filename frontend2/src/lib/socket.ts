@@ -0,0 +1,81 @@
+/**
+ * Socket.IO Client
+ * Single shared connection to the Flask backend. The server authenticates the
+ * handshake token and pushes dashboard deltas to this user's rooms:
+ *   transaction_created - new history row (with direction) + activity bucket
+ *   stats_delta         - admin counter increments (admins only)
+ *   fraud_alert         - the new alert row for a blocked payment (admins only)
+ */
+
+import { io, Socket } from 'socket.io-client';
+
+const SOCKET_URL = import.meta.env.VITE_BACKEND_URL || 'http://localhost:5000';
+
+// Dashboards still resync over REST at this interval in case a push was missed
+export const FALLBACK_REFRESH_MS = 120000;
+
+export interface ActivityBucket {
+    minute: string | null;
+    safe: number;
+    blocked: number;
+}
+
+export interface TransactionCreatedEvent {
+    transaction: {
+        transaction_ref: string;
+        sender_upi_id: string;
+        receiver_upi_id: string;
+        amount: number;
+        status: string;
+        is_fraud: boolean;
+        fraud_score: number;
+        created_at: string;
+        direction: 'sent' | 'received';
+    };
+    activity: ActivityBucket;
+}
+
+export interface StatsDeltaEvent {
+    deltas: Record<string, number>;
+    transaction?: TransactionCreatedEvent['transaction'];
+    activity?: ActivityBucket;
+}
+
+let socket: Socket | null = null;
+
+/**
+ * Get the shared socket, connecting on first use.
+ * The token is read on every (re)connect so a new login is picked up.
+ */
+export const getSocket = (): Socket => {
+    if (!socket) {
+        socket = io(SOCKET_URL, {
+            auth: (cb) => cb({ token: localStorage.getItem('authToken') }),
+            transports: ['websocket', 'polling'],
+            reconnection: true,
+            reconnectionDelay: 1000,
+            reconnectionDelayMax: 10000,
+        });
+    }
+    return socket;
+};
+
+/**
+ * Subscribe to a server event. Returns the unsubscribe function.
+ */
+export const subscribe = <T,>(event: string, handler: (payload: T) => void) => {
+    const s = getSocket();
+    s.on(event, handler);
+    return () => {
+        s.off(event, handler);
+    };
+};
+
+/**
+ * Reconnect with the current token (after login/logout).
+ */
+export const reconnectSocket = () => {
+    if (socket) {
+        socket.disconnect().connect();
+    }
+};
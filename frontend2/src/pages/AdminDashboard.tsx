@@ -1,8 +1,10 @@
 import { Navbar } from "@/components/Navbar";
 import { Footer } from "@/components/Footer";
 import { motion } from "framer-motion";
-import { useEffect, useState } from "react";
+import { useState } from "react";
 import { adminAPI } from "@/lib/api";
+import { StatsDeltaEvent } from "@/lib/socket";
+import { useLiveUpdates } from "@/hooks/use-live-updates";
 import {
     Shield,
     AlertTriangle,
@@ -30,6 +32,14 @@ interface AdminStats {
     pendingAlerts: number;
 }
 
+// /api/admin/stats counter names -> dashboard fields
+const STAT_FIELDS: Record<string, keyof AdminStats> = {
+    total_users: 'totalUsers',
+    total_transactions: 'totalTransactions',
+    blocked_transactions: 'blockedTransactions',
+    pending_alerts: 'pendingAlerts',
+};
+
 const AdminDashboard = () => {
     const [stats, setStats] = useState<AdminStats>({
         totalUsers: 0,
@@ -40,19 +50,27 @@ const AdminDashboard = () => {
     const [alerts, setAlerts] = useState<Alert[]>([]);
     const [loading, setLoading] = useState(true);
 
+    const loadAlerts = async () => {
+        const alertsResponse = await adminAPI.getAlerts(1, 10, false);
+        if (alertsResponse.status === 'success') {
+            setAlerts(alertsResponse.data.alerts || []);
+        }
+    };
+
     const loadAdminData = async () => {
         try {
             // Load admin stats
             const statsResponse = await adminAPI.getStats();
             if (statsResponse.status === 'success') {
-                setStats(statsResponse.data);
+                const loaded = { ...stats };
+                Object.entries(STAT_FIELDS).forEach(([name, field]) => {
+                    loaded[field] = statsResponse.data[name] ?? 0;
+                });
+                setStats(loaded);
             }
 
             // Load fraud alerts
-            const alertsResponse = await adminAPI.getAlerts(1, 10, false);
-            if (alertsResponse.status === 'success') {
-                setAlerts(alertsResponse.data.alerts || []);
-            }
+            await loadAlerts();
         } catch (error) {
             console.error('Failed to load admin data:', error);
         } finally {
@@ -60,12 +78,23 @@ const AdminDashboard = () => {
         }
     };
 
-    useEffect(() => {
-        loadAdminData();
-        // Refresh every 15 seconds
-        const interval = setInterval(loadAdminData, 15000);
-        return () => clearInterval(interval);
-    }, []);
+    // Counter increments are pushed to the admins room; a fraud alert
+    // carries the new alert row, which is prepended to the list
+    useLiveUpdates(loadAdminData, {
+        stats_delta: ({ deltas }: StatsDeltaEvent) => {
+            setStats((prev) => {
+                const next = { ...prev };
+                Object.entries(deltas).forEach(([name, delta]) => {
+                    const field = STAT_FIELDS[name];
+                    if (field) next[field] += delta;
+                });
+                return next;
+            });
+        },
+        fraud_alert: ({ alert }: { alert: Alert }) => {
+            setAlerts((prev) => [alert, ...prev.filter((a) => a.id !== alert.id)].slice(0, 10));
+        },
+    });
 
     const StatCard = ({
         icon: Icon,